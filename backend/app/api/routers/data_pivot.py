@@ -1,10 +1,8 @@
 # src/api/routers/data_pivot.py
 import os
-import json
 import uuid
 from pathlib import Path
 from threading import Lock
-from datetime import datetime
 from sqlalchemy.orm import Session
 from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
 from fastapi.responses import FileResponse
@@ -15,7 +13,7 @@ from ...core.config import settings
 from ...core.data_mapping import ELEMENT_TO_DB_MAPPING, get_name_to_id_mapping
 from ...core.data_pivot import get_grid_data_for_heatmap, get_correct_grid_time_series_for_coord
 from ...tasks.data_pivot import evaluate_model, create_export_zip_task, create_export_images_task, evaluate_models_by_metrics
-from ...utils.file_io import find_corrected_nc_file_for_timestamp
+from ...utils.file_io import find_corrected_nc_file_for_timestamp, load_json, decode_result_blob
 
 
 # 为数据透视模块的即时查询任务创建一个独立的内存存储和锁
@@ -148,11 +146,8 @@ def get_model_evaluate_status(task_id: str, db: Session = Depends(get_db)):
 
         result_path = Path(result_path_str)
         if result_path.exists():
-            with open(result_path, 'r', encoding='utf-8') as f:
-                results_json = json.load(f)
-                # 将结果中的ISO格式时间字符串转换回datetime对象以符合响应模型
-                results_json['timestamps'] = [datetime.fromisoformat(ts) for ts in results_json['timestamps']]
-                response_data["results"] = results_json
+            # 结果中的ISO格式时间字符串由响应模型(pydantic)直接校验为datetime, 无需在python中逐个转换
+            response_data["results"] = load_json(result_path)
         else:
             # 如果结果文件丢失，更新任务状态为失败
             crud.update_task_status(db, task.task_id, "FAILED", task.cur_progress, "任务失败：结果文件已丢失")
@@ -503,15 +498,19 @@ def get_model_ranking_status(task_id: str, db: Session = Depends(get_db)):
 
     if task.status == "COMPLETED":
         params = task.get_params()
+        # 较小的排序结果直接保存在任务参数中
+        if params.get("result_blob"):
+            response_data["results"] = decode_result_blob(params["result_blob"])
+            return response_data
+
         result_path_str = params.get("result_path")
         if not result_path_str:
              raise HTTPException(status_code=404, detail="任务成功但结果文件路径未找到")
 
         result_path = Path(result_path_str)
         if result_path.exists():
-            with open(result_path, 'r', encoding='utf-8') as f:
-                results_json = json.load(f)
-                response_data["results"] = results_json
+            results_json = load_json(result_path)
+            response_data["results"] = results_json
         else:
             # 如果结果文件丢失，更新任务状态为失败
             crud.update_task_status(db, task.task_id, "FAILED", task.cur_progress, "任务失败：结果文件已丢失")
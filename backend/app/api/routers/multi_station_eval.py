@@ -1,6 +1,5 @@
 # src/api/routers/multi_station_eval.py
 import uuid
-import json
 from pathlib import Path
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from fastapi.responses import FileResponse
@@ -10,6 +9,7 @@ from ...db import crud
 from ...db.database import get_db
 from ...core import schemas
 from ...tasks.multi_station_eval import run_multi_station_eval
+from ...utils.file_io import load_json
 
 router = APIRouter(
     prefix="/model-train/multi-station-eval",
@@ -79,8 +79,7 @@ def get_eval_status(task_id: str, db: Session = Depends(get_db)):
         params = task.get_params()
         json_path_str = params.get("result_json_path")
         if json_path_str and Path(json_path_str).exists():
-            with open(json_path_str, "r", encoding="utf-8") as f:
-                response["results"] = json.load(f)
+            response["results"] = load_json(json_path_str)
     
     return response
 
@@ -49,6 +49,7 @@ class Settings(BaseSettings):
     CST_YEARS: List[int] = config.get("cst_years", [])
     EARLY_STOPING_ROUNDS: str = config.get("early_stopping_rounds", "100")
     LAGS_CONFIG: Dict[str, Any] = config.get("lags_config", {})
+    PREDICT_DEVICE: str = str(config.get("predict_device", "cpu"))   # 模型推理设备: cpu/cuda(仅对XGBoost模型生效)
     
 
 settings = Settings()
@@ -4,73 +4,123 @@ import pandas as pd
 import xarray as xr
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from ..core.config import settings
 from ..core.data_mapping import ELEMENT_TO_NC_MAPPING, NC_TO_DB_MAPPING
 from ..utils.file_io import get_grid_files_for_season, create_file_packages
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
-def build_feature_for_block(
-        grid_block_ds: xr.DataArray,  dem_ds: xr.DataArray, 
-        lag_files: Dict[str, Optional[Path]], element: str, timestamp: datetime,
-) -> pd.DataFrame:
-    """为单个空间块构建特征df"""
+
+def _assemble_features_numpy(lat_values, lon_values, time_values, planes, out):
+    """组装特征矩阵(numpy实现): 每行依次为lat, lon, 4个时间特征, 以及planes中各特征场在该格点的值"""
+    n_lat, n_lon = lat_values.size, lon_values.size
+    out[:, 0] = np.repeat(lat_values, n_lon)
+    out[:, 1] = np.tile(lon_values, n_lat)
+    out[:, 2:6] = time_values
+    out[:, 6:] = planes.reshape(planes.shape[0], -1).T
+
+def _assemble_features_kernel(lat_values, lon_values, time_values, planes, out):
+    """组装特征矩阵(numba JIT实现), 一次遍历写完每行的所有特征"""
+    n_lat, n_lon = lat_values.size, lon_values.size
+    n_planes = planes.shape[0]
+    for i in range(n_lat):
+        for j in range(n_lon):
+            row = i * n_lon + j
+            out[row, 0] = lat_values[i]
+            out[row, 1] = lon_values[j]
+            for k in range(4):
+                out[row, 2 + k] = time_values[k]
+            for k in range(n_planes):
+                out[row, 6 + k] = planes[k, i, j]
+
+# numba为可选依赖: 安装时使用JIT编译的内核, 否则退回numpy实现
+# 调用方已在多个线程中并行处理各条带, 因此内核释放GIL(nogil)而不再使用numba的parallel线程池
+if njit is not None:
+    _assemble_features = njit(nogil=True, cache=True, fastmath=True)(_assemble_features_kernel)
+else:
+    _assemble_features = _assemble_features_numpy
+
+def get_block_feature_columns(element: str) -> List[str]:
+    """获取空间块特征矩阵的列顺序, 和训练模型时保持一致"""
     nc_var = ELEMENT_TO_NC_MAPPING[element]
     db_var = NC_TO_DB_MAPPING[nc_var]
-    # 展平数据并创建df
-    grid_block_df = grid_block_ds.to_dataframe(name=f"{db_var}_grid").reset_index()
-
-    # 添加时间特征
-    grid_block_df["year"] = timestamp.year
-    grid_block_df["month"] = timestamp.month
-    grid_block_df["day"] = timestamp.day
-    grid_block_df["hour"] = timestamp.hour
-    
-    # 添加滞后特征
     lags = settings.LAGS_CONFIG.get(element, [])
-    # 创建特征列
-    for lag in lags:
-        lag_key = f"lag_{lag}h"
-        db_lag_key = f"{db_var}_grid_{lag_key}"
-        # 从传入的lag_files字典中安全获取文件路径
-        lag_file = lag_files.get(lag_key)
+    base_columns = ["lat", "lon", "year", "month", "day", "hour"]
+    grid_columns = [f"{db_var}_grid"]
+    lag_columns = [f"{db_var}_grid_lag_{lag}h" for lag in lags]
+    terrain_columns = ["elevation", "slope", "aspect"]
+    return base_columns + grid_columns + lag_columns + terrain_columns
+
+def load_lag_arrays(lag_files: Dict[str, Optional[Path]], element: str) -> Dict[str, Optional[xr.DataArray]]:
+    """一次性读取当前文件所需的所有滞后文件到内存, 读取失败或文件不存在的滞后项为None"""
+    nc_var = ELEMENT_TO_NC_MAPPING[element]
+    lag_arrays = {}
+    for lag_key, lag_file in lag_files.items():
+        lag_arrays[lag_key] = None
         if lag_file and lag_file.exists():
             try:
-                with xr.open_dataset(lag_file) as lag_ds:
-                    lag_block_ds = lag_ds[nc_var].sel(
-                        lat=grid_block_df["lat"].to_xarray(),
-                        lon=grid_block_df["lon"].to_xarray(),
-                        method="nearest"
-                    )
-                    grid_block_df[db_lag_key] = lag_block_ds.values.flatten()
+                with xr.open_dataset(lag_file, decode_times=False) as lag_ds:
+                    lag_arrays[lag_key] = lag_ds[nc_var].load()
             except Exception as e:
                 print(f"|--> 警告: 读取滞后文件 {lag_file} 失败: {e}. 使用NaN填充")
-                grid_block_df[db_lag_key] = np.nan
+    return lag_arrays
+
+def build_feature_for_block(
+        grid_block_ds: xr.DataArray,  dem_ds: xr.DataArray, 
+        lag_arrays: Dict[str, Optional[xr.DataArray]], element: str, timestamp: datetime,
+        out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    为单个空间块构建特征矩阵(行按lat优先展平, 列顺序见get_block_feature_columns)
+
+    :param lag_arrays: 由load_lag_arrays读取的滞后项格点数据, 在同一文件的各空间块之间复用
+    :param out: 预分配的float32特征缓冲区, 形状至少为(块内格点数, 特征数), 传入时原地填充并返回其视图
+    """
+    lags = settings.LAGS_CONFIG.get(element, [])
+    n_features = len(get_block_feature_columns(element))
+
+    # 块内格点的经纬度(lat优先展平, 与to_dataframe的行顺序一致)
+    lat_values = grid_block_ds["lat"].values
+    lon_values = grid_block_ds["lon"].values
+    n_lat, n_lon = lat_values.size, lon_values.size
+    n_rows = n_lat * n_lon
+    if out is None:
+        out = np.empty((n_rows, n_features), dtype=np.float32)
+    features = out[:n_rows]
+
+    # 按列顺序收集逐格点的二维特征场: 格点值, 各滞后项, 地形(高程/坡度/坡向)
+    planes = np.empty((1 + len(lags) + 3, n_lat, n_lon), dtype=np.float32)
+    planes[0] = grid_block_ds.values.reshape(n_lat, n_lon)
+    
+    # 添加滞后特征
+    for i, lag in enumerate(lags):
+        lag_array = lag_arrays.get(f"lag_{lag}h")
+        if lag_array is not None:
+            try:
+                lag_block_ds = lag_array.sel(lat=lat_values, lon=lon_values, method="nearest")
+                planes[1 + i] = lag_block_ds.transpose(..., "lat", "lon").values.reshape(n_lat, n_lon)
+            except Exception as e:
+                print(f"|--> 警告: 提取滞后项 lag_{lag}h 失败: {e}. 使用NaN填充")
+                planes[1 + i] = np.nan
         else:
-            # print(f"|--> 警告: 滞后文件 {lag_file} 不存在. 使用NaN填充")
-            grid_block_df[db_lag_key] = np.nan
+            planes[1 + i] = np.nan
         
     # 添加地形特征
-    terrain_feature = dem_ds.sel(
-        lat=grid_block_df["lat"].to_xarray(),
-        lon=grid_block_df["lon"].to_xarray(),
-        method="nearest"
-    )
-    grid_block_df["elevation"] = terrain_feature["elevation"].values
-    grid_block_df["slope"] = terrain_feature["slope"].values
-    grid_block_df["aspect"] = terrain_feature["aspect"].values
-
-    # 定义列的顺序
-    base_columns = ["lat", "lon", "year", "month", "day", "hour"]
-    grid_columns = [f"{db_var}_grid"]
-    lag_columns = [f"{db_var}_grid_lag_{lag}h" for lag in lags]
-    terrain_columns = ["elevation", "slope", "aspect"]
-    # 重新排列列的顺序
-    grid_block_df = grid_block_df[base_columns + grid_columns + lag_columns + terrain_columns]
-
-    return grid_block_df
+    terrain_feature = dem_ds.sel(lat=lat_values, lon=lon_values, method="nearest")
+    for i, var in enumerate(["elevation", "slope", "aspect"]):
+        planes[1 + len(lags) + i] = terrain_feature[var].transpose(..., "lat", "lon").values.reshape(n_lat, n_lon)
 
+    # 组装特征矩阵: 经纬度, 时间特征, 以及上面收集的二维特征场
+    time_values = np.array([timestamp.year, timestamp.month, timestamp.day, timestamp.hour], dtype=np.float32)
+    _assemble_features(
+        lat_values.astype(np.float32), lon_values.astype(np.float32), time_values, planes, features
+    )
 
+    return features
 
 if __name__ == '__main__':
     grid_files = get_grid_files_for_season(settings.GRID_DATA_DIR, "wind_velocity", "2020", "2020", "全年")
@@ -82,7 +132,7 @@ if __name__ == '__main__':
     grid_ds = xr.open_dataset(file_packages[24]["current_file"])
     dem_ds = xr.open_dataset(settings.DEM_DATA_PATH)
     grid_block_ds = grid_ds["wind_velocity"][0: 100, 0:100]
-    feature_df = build_feature_for_block(grid_block_ds, dem_ds, lag_files, "2分钟平均风速", timestamp)
-    print(feature_df.head(24).iloc[:, :10])
-    print(feature_df.shape)
-    print(feature_df.columns)
\ No newline at end of file
+    lag_arrays = load_lag_arrays(lag_files, "2分钟平均风速")
+    features = build_feature_for_block(grid_block_ds, dem_ds, lag_arrays, "2分钟平均风速", timestamp)
+    print(pd.DataFrame(features, columns=get_block_feature_columns("2分钟平均风速")).head(24).iloc[:, :10])
+    print(features.shape)
\ No newline at end of file
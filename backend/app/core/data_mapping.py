@@ -1,5 +1,8 @@
 # src/core/data_mapping.py
+import os
+import numpy as np
 import pandas as pd
+from functools import lru_cache
 
 
 # 原始站点数据字段与数据表字段映射
@@ -54,7 +57,12 @@ def get_elements_mapping():
     return vars_map
 
 def get_name_to_id_mapping(station_info_file):
-    """获取站点名称到ID的映射关系"""
+    """获取站点名称到ID的映射关系(按文件路径和修改时间缓存, 文件更新后自动重新读取; 返回值只读, 不要修改)"""
+    return _load_name_to_id_mapping(str(station_info_file), os.path.getmtime(station_info_file))
+
+@lru_cache(maxsize=4)
+def _load_name_to_id_mapping(station_info_file: str, mtime: float):
+    """读取站点信息文件, 构建站点名称到ID的映射关系"""
     station_mapping = {}
     station_info = pd.read_csv(station_info_file, encoding='gbk')
     for _, row in station_info.iterrows():
@@ -81,6 +89,50 @@ def get_id_to_name_mapping(station_info_file):
         }
     return station_mapping
 
+# 平年中每月1日之前的累计天数
+_CUM_DAYS_BEFORE_MONTH = np.array([0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334])
+# 平年中每月的天数
+_DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+def _to_int_time_part(values, name: str) -> np.ndarray:
+    """将年/月/日/时转换为整数数组, 存在缺失值或非整数值时抛出ValueError"""
+    arr = np.asarray(values)
+    if pd.isna(arr).any():
+        raise ValueError(f"时间列 '{name}' 存在 {int(pd.isna(arr).sum())} 个缺失值")
+    arr_int = arr.astype(np.int64)
+    if arr.dtype.kind == "f" and (arr_int != arr).any():
+        raise ValueError(f"时间列 '{name}' 存在非整数值")
+    return arr_int
+
+def _check_time_part_range(valid: np.ndarray, name: str, values: np.ndarray):
+    """时间分量超出合法范围时抛出ValueError(与pd.to_datetime一致, 不生成错位的时间戳)"""
+    if not valid.all():
+        invalid = values[~valid]
+        raise ValueError(f"时间列 '{name}' 存在 {invalid.size} 个超出范围的值, 例如: {invalid[0]}")
+
+def build_timestamps(year, month, day, hour) -> np.ndarray:
+    """
+    根据年、月、日、时数组直接计算时间戳(向量化的整数运算, 替代pd.to_datetime按列组装)。
+    与pd.to_datetime一样, 存在缺失值或不合法的日期时间(如13月、2月30日、24时)时抛出ValueError。
+    """
+    y = _to_int_time_part(year, "year")
+    m = _to_int_time_part(month, "month")
+    d = _to_int_time_part(day, "day")
+    h = _to_int_time_part(hour, "hour")
+    is_leap = (y % 4 == 0) & ((y % 100 != 0) | (y % 400 == 0))
+    _check_time_part_range((m >= 1) & (m <= 12), "month", m)
+    days_in_month = _DAYS_IN_MONTH[m - 1] + ((m == 2) & is_leap)
+    _check_time_part_range((d >= 1) & (d <= days_in_month), "day", d)
+    _check_time_part_range((h >= 0) & (h <= 23), "hour", h)
+
+    day_of_year = _CUM_DAYS_BEFORE_MONTH[m - 1] + d - 1 + ((m > 2) & is_leap)
+    days_since_epoch = (
+        (y - 1970) * 365 + np.floor_divide(y - 1969, 4)
+        - np.floor_divide(y - 1901, 100) + np.floor_divide(y - 1601, 400) + day_of_year
+    )
+    seconds = days_since_epoch * 86400 + h * 3600
+    return seconds.astype("datetime64[s]")
+
 def cst_to_utc(cst_times):
     """北京时转世界时"""
     if isinstance(cst_times, pd.Series):
@@ -12,36 +12,35 @@ from ..utils.file_io import find_nc_file_for_timestamp, find_corrected_nc_file_f
 
 
 def bulid_feature_for_pivot(df: pd.DataFrame, element: str):
-    """为数据透视的模型评估构建用于模型预测的特征"""
+    """为数据透视的模型评估构建用于模型预测的特征(不修改传入的df, 调用方无需先复制)"""
     if df.empty:
         return df
     
-    # 添加地形特征
+    # 获取地形特征
     dem_ds = xr.open_dataset(settings.DEM_DATA_PATH)
     lat, lon = df.iloc[0]['lat'], df.iloc[0]['lon']
     elevation, slope, aspect = get_terrain_feature(dem_ds, lat, lon)
-    df['elevation'] = elevation
-    df['slope'] = slope
-    df['aspect'] = aspect
     dem_ds.close()
 
-    # 添加滞后特征
+    # 特征列的顺序, 和训练模型时保持一致
     element_db_column = ELEMENT_TO_DB_MAPPING[element]
     grid_col = f"{element_db_column}_grid"
     lags = settings.LAGS_CONFIG.get(element, [])
-    for lag in lags:
-        df[f"{grid_col}_lag_{lag}h"] = df[grid_col].shift(lag)
-    # 删除因滞后项产生的NaN行
-    df.dropna(inplace=True)
-
-    # 重排特征列的顺序, 和训练模型时保持一致
     base_columns = ["lat", "lon", "year", "month", "day", "hour"]
     grid_columns = [grid_col]
-    lag_columns = [f"{grid_col}_lag_{lag}h" for lag in lags]
-    terrain_columns = ["elevation", "slope", "aspect"]
-    feature_columns = base_columns + grid_columns + lag_columns + terrain_columns
-    df_X = df[feature_columns]
-    df_y = df[element_db_column]
+
+    # 只复制特征需要的列, 再按顺序依次添加滞后特征和地形特征
+    df_X = df[base_columns + grid_columns].copy()
+    for lag in lags:
+        df_X[f"{grid_col}_lag_{lag}h"] = df[grid_col].shift(lag)
+    df_X['elevation'] = elevation
+    df_X['slope'] = slope
+    df_X['aspect'] = aspect
+
+    # 删除含NaN的行(包括因滞后项产生的NaN行)
+    valid_rows = df_X.notna().all(axis=1) & df.notna().all(axis=1)
+    df_X = df_X[valid_rows]
+    df_y = df.loc[valid_rows, element_db_column]
 
     return df_X, df_y
 
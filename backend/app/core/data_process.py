@@ -19,6 +19,16 @@ NOISE_CONFIG = {
     "2分钟平均风速": {"scale": 0.3, "bias": 0.05}
 }
 
+# 时间分量列的紧凑类型(固定类型而不是按取值降级, 保证各月写入Parquet时schema一致)
+CALENDAR_COLUMN_DTYPES = {"year": "int16", "month": "int8", "day": "int8", "hour": "int8"}
+
+def shrink_calendar_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """将年/月/日/时列从int64降为紧凑整数类型(原地修改), 减少合并和写入Parquet时的数据量"""
+    for col, dtype in CALENDAR_COLUMN_DTYPES.items():
+        if col in df.columns and df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
 def clean_station_data(df: pd.DataFrame, element: str) -> pd.DataFrame:
     """清洗站点数据"""
     df_cleaned = df.copy()
@@ -54,17 +64,41 @@ def clean_station_data(df: pd.DataFrame, element: str) -> pd.DataFrame:
 
     return df_cleaned
 
-def extract_grid_values_for_stations(ds, var_grid: str, station_coords: dict, year: str) -> pd.DataFrame:
-    """从数据集中提取网格值"""
-    lats = [info["lat"] for info in station_coords.values()]
-    lons = [info["lon"] for info in station_coords.values()]
+def get_station_grid_indices(ds, station_coords: dict) -> tuple:
+    """
+    计算各站点最近格点在lat/lon轴上的整数索引(与sel(method="nearest")的结果一致)。
+    同一年各月的格点文件经纬度轴相同, 只需计算一次, 之后各月直接用isel按索引提取。
+
+    :return: (lat_values, lon_values, lat_idx, lon_idx), 前两项为计算时使用的经纬度轴, 用于判断能否复用.
+    """
+    lat_values = ds["lat"].values
+    lon_values = ds["lon"].values
+    lats = np.array([info["lat"] for info in station_coords.values()], dtype=np.float64)
+    lons = np.array([info["lon"] for info in station_coords.values()], dtype=np.float64)
+    lat_idx = np.abs(lat_values[np.newaxis, :] - lats[:, np.newaxis]).argmin(axis=1)
+    lon_idx = np.abs(lon_values[np.newaxis, :] - lons[:, np.newaxis]).argmin(axis=1)
+    return lat_values, lon_values, lat_idx, lon_idx
+
+def extract_grid_values_for_stations(ds, var_grid: str, station_coords: dict, year: str, station_indices: tuple = None) -> pd.DataFrame:
+    """
+    从数据集中提取网格值
+
+    :param station_indices: get_station_grid_indices的返回值; 与当前数据集的经纬度轴一致时直接复用, 否则重新计算.
+    """
     station_ids = list(station_coords.keys())
-    sel_data = ds[var_grid].sel(
-        lat=xr.DataArray(lats, dims="station"), 
-        lon=xr.DataArray(lons, dims="station"), 
-        method="nearest"
+    if (
+        station_indices is None
+        or not np.array_equal(station_indices[0], ds["lat"].values)
+        or not np.array_equal(station_indices[1], ds["lon"].values)
+    ):
+        station_indices = get_station_grid_indices(ds, station_coords)
+    _, _, lat_idx, lon_idx = station_indices
+    sel_data = ds[var_grid].isel(
+        lat=xr.DataArray(lat_idx, dims="station"), 
+        lon=xr.DataArray(lon_idx, dims="station")
     )
-    df = sel_data.to_dataframe().reset_index()
+    # 最近格点的经纬度坐标不需要, 在转换为DataFrame之前丢弃, 不再为每行生成lat/lon列
+    df = sel_data.drop_vars(["lat", "lon"], errors="ignore").to_dataframe().reset_index()
 
     # 将grid_var列重命名为DB中的列名
     db_column_name = NC_TO_DB_MAPPING.get(var_grid)
@@ -75,9 +109,9 @@ def extract_grid_values_for_stations(ds, var_grid: str, station_coords: dict, ye
     if grid_col_name in df.columns:
         df.loc[df[grid_col_name] > 1000, grid_col_name] = None
 
-    # 添加站点ID映射
-    df["station_id_grid"] = df["station"].apply(lambda x: station_ids[x])
-    df.drop(columns=["station", "lat", "lon"], inplace=True)
+    # 添加站点ID映射(按站点序号直接索引, 不再逐行调用apply)
+    df["station_id_grid"] = np.asarray(station_ids)[df["station"].to_numpy()]
+    df.drop(columns=["station"], inplace=True)
 
     # 北京时转换为世界时
     if hasattr(settings, 'CST_YEARS') and int(year) in settings.CST_YEARS:
@@ -217,7 +217,7 @@ class DataCorrectRequest(BaseModel):
     start_year: str = Field(default="2008", description="起始年份", example=["2008", "2023"])
     end_year: str = Field(default="2023", description="结束年份", example=["2008", "2023"])
     season: str = Field(default="全年", description="季节")
-    block_size: int = Field(default=100, description="空间大小, 原图大小为460x800", example=100)
+    block_size: int = Field(default=100, description="每次批量预测的纬向行数(横跨整个经度范围), 原图大小为460x800", example=100)
     num_workers: int = Field(default=48, description="工作进程数")
 
 
@@ -1,8 +1,9 @@
 # src/db/crud.py
+import time
 import pandas as pd
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import text, exists
+from sqlalchemy import text, exists, func, select
 from sqlalchemy.orm import Session
 # 导入针对 SQLite 的特殊 insert 语句构造器
 from sqlalchemy.dialects.sqlite import insert
@@ -36,6 +37,29 @@ def create_task(db: Session, task_id: str, task_name: str, task_type: str, param
     db.refresh(task)
     return task
 
+def bulk_create_tasks(db: Session, task_specs: list, parent_task_id: str = None) -> List[db_models.TaskProgress]:
+    """
+    在一个事务中批量创建多个任务(通常是同一父任务下的子任务), 只提交一次。
+
+    :param db: SQLAlchemy数据库会话.
+    :param task_specs: [(任务ID, 任务名称, 任务类型, 任务参数), ...].
+    :param parent_task_id: 父任务ID.
+    :return: 创建的任务对象列表(与task_specs顺序一致).
+    """
+    tasks = []
+    for task_id, task_name, task_type, params in task_specs:
+        task = db_models.TaskProgress(
+            task_id=task_id,
+            task_name=task_name,
+            task_type=task_type,
+            parent_task_id=parent_task_id
+        )
+        task.set_params(params)
+        tasks.append(task)
+    db.add_all(tasks)
+    db.commit()
+    return tasks
+
 def update_task_status(db: Session, task_id: str, status: str, progress: float, text: str):
     """
     更新任务状态, 进度, 进度的文字说明。
@@ -45,15 +69,67 @@ def update_task_status(db: Session, task_id: str, status: str, progress: float,
     :param status: 任务状态.
     :param progress: 任务进度.
     """
-    task = db.query(db_models.TaskProgress).filter(db_models.TaskProgress.task_id == task_id).first()
-    if task:
-        task.status = status
-        task.cur_progress = progress
-        task.progress_text = text
-        if status in ["COMPLETED", "FAILED"]:
-            task.end_time = datetime.now()
+    # 直接执行一条UPDATE语句, 不必先把整行任务记录查询并加载为ORM对象
+    values = {"status": status, "cur_progress": progress, "progress_text": text}
+    if status in ["COMPLETED", "FAILED"]:
+        values["end_time"] = datetime.now()
+    updated = db.query(db_models.TaskProgress).filter(
+        db_models.TaskProgress.task_id == task_id
+    ).update(values, synchronize_session=False)
+    if updated:
         db.commit()
 
+class ThrottledStatusUpdater:
+    """
+    节流的任务进度更新器: 仅当距上次写入超过min_interval秒或进度前进超过min_step时才写入数据库,
+    用于循环中的高频进度汇报, 避免每次迭代都执行一次UPDATE。
+
+    :param db: SQLAlchemy数据库会话.
+    :param task_id: 任务ID.
+    :param min_interval: 两次写入之间的最小时间间隔(秒).
+    :param min_step: 触发写入的最小进度增量.
+    """
+    def __init__(self, db: Session, task_id: str, min_interval: float = 1.0, min_step: float = 5.0):
+        self.db = db
+        self.task_id = task_id
+        self.min_interval = min_interval
+        self.min_step = min_step
+        self._last_time = None
+        self._last_progress = None
+        self._last_text = None
+
+    def update(self, status: str, progress: float, text: str, force: bool = False) -> bool:
+        """按节流规则更新任务状态, force=True时总是写入; 返回本次是否实际写入"""
+        now = time.monotonic()
+        if not force:
+            if text == self._last_text and progress == self._last_progress:
+                return False
+            if self._last_time is not None and now - self._last_time < self.min_interval \
+                    and progress - self._last_progress < self.min_step:
+                return False
+        update_task_status(self.db, self.task_id, status, progress, text)
+        self._last_time = now
+        self._last_progress = progress
+        self._last_text = text
+        return True
+
+def bulk_update_task_progress(db: Session, progress_updates: dict):
+    """
+    在一个事务中批量更新多个任务的进度, 仅更新仍处于 PROCESSING 状态的任务(避免覆盖已完成/失败的状态)。
+
+    :param db: SQLAlchemy数据库会话.
+    :param progress_updates: {任务ID: (任务进度, 进度的文字说明)}.
+    """
+    if not progress_updates:
+        return
+    tasks = db.query(db_models.TaskProgress).filter(
+        db_models.TaskProgress.task_id.in_(list(progress_updates.keys())),
+        db_models.TaskProgress.status == "PROCESSING"
+    ).all()
+    for task in tasks:
+        task.cur_progress, task.progress_text = progress_updates[task.task_id]
+    db.commit()
+
 def cancel_subtask(db: Session, parent_task_id: str):
     """取消指定父任务下所有处于 PENDING/PROCESSING 状态的子任务。"""
     tasks_to_cancel = db.query(db_models.TaskProgress).filter(
@@ -124,31 +200,42 @@ def get_subtasks_by_parent_id(db: Session, parent_task_id: str):
     """
     return db.query(db_models.TaskProgress).filter(db_models.TaskProgress.parent_task_id == parent_task_id).all()
 
+def count_finished_subtasks(db: Session, parent_task_id: str) -> int:
+    """
+    统计指定父任务下已结束(完成或失败)的子任务数量, 由数据库直接计数, 不加载子任务记录。
+
+    :param db: SQLAlchemy数据库会话.
+    :param parent_task_id: 父任务ID.
+    :return: 已结束的子任务数量.
+    """
+    return db.query(func.count(db_models.TaskProgress.task_id)).filter(
+        db_models.TaskProgress.parent_task_id == parent_task_id,
+        db_models.TaskProgress.status.in_(["COMPLETED", "FAILED"])
+    ).scalar() or 0
+
 def get_global_filenames_by_status(db: Session, task_type: str, status: str) -> list[str]:
     """
     【全局查询】获取所有状态为 `status` 的数据导入子任务，并返回文件名列表(从params中获取文件名-暂时只适用于DataImport任务)。
     
     注意：这个函数不区分父任务，会返回所有历史任务中符合条件的子任务。
     """
-    tasks = db.query(db_models.TaskProgress).filter(
+    # 直接读取生成列file_name(由SQLite在数据库端解析JSON), 无需在Python中逐条解析task_params
+    rows = db.query(
+        db_models.TaskProgress.file_name,
+        db_models.TaskProgress.cur_progress,
+        db_models.TaskProgress.progress_text
+    ).filter(
         db_models.TaskProgress.task_type == task_type,
         db_models.TaskProgress.status == status
     ).all()
 
-    file_names = []
+    file_names = [row.file_name for row in rows if row.file_name is not None]
     progress = None
     progress_text = None
-    for task in tasks:
-        # 修正 #1: 使用 task.get_params() 方法将JSON字符串安全地转换为字典
-        params_dict = task.get_params()
-        
-        # 修正 #3: 从字典中读取的键是 'file'，与创建任务时保持一致
-        if params_dict and "file_name" in params_dict:
-            file_names.append(params_dict["file_name"])
-        # 获取处理中的文件进度
-        if status == "PROCESSING":
-            progress = task.cur_progress
-            progress_text = task.progress_text
+    # 获取处理中的文件进度
+    if status == "PROCESSING" and rows:
+        progress = rows[-1].cur_progress
+        progress_text = rows[-1].progress_text
     
     return file_names, progress, progress_text
 
@@ -196,17 +283,21 @@ def upsert_raw_station_data(db: Session, df: pd.DataFrame):
     """
     使用数据库原生的 "INSERT ... ON CONFLICT DO UPDATE"功能,
     将处理后的站点数据高效的"upsert"到数据库中。
+
+    同一条Core insert语句配合参数列表一次执行(executemany), 列名由表结构校验, DateTime由方言负责绑定;
+    参数行直接由itertuples组装, 不再经过DataFrame.to_dict逐行构建。
     """
     if df.empty:
         return
     
-    records_to_process = df.to_dict(orient="records")
+    columns = list(df.columns)
+    records_to_process = [dict(zip(columns, row)) for row in df.itertuples(index=False, name=None)]
     table = db_models.RawStationData.__table__
     stmt = insert(table)
 
     # 在冲突时, 更新df中存在的所有列(除了主键和唯一键)
     update_columns = [
-        col for col in df.columns
+        col for col in columns
         if col not in ["id", "station_id", "timestamp"] # 不更新主键和唯一约束键
     ]
     update_dict = {col: getattr(stmt.excluded, col) for col in update_columns}
@@ -356,6 +447,37 @@ def check_existed_element_by_year(db: Session, element: str, year: int) -> bool:
     # scalar() 方法返回第一个元素的值, 如果存在则为 True, 否则为 False
     return db.execute(query).scalar()
 
+def get_existed_elements_years(db: Session, elements: List[str], years) -> set:
+    """
+    一次查询检查多个要素、多个年份的数据是否已经存在。
+
+    :param db: SQLAlchemy数据库会话.
+    :param elements: 要素名称列表.
+    :param years: 年份列表.
+    :return: 已存在数据的{(要素, 年份)}集合.
+    """
+    combos = []
+    exists_columns = []
+    for element in elements:
+        db_column_name = ELEMENT_TO_DB_MAPPING.get(element)
+        if not db_column_name:
+            raise ValueError(f"无效的要素名称: {element}")
+        db_column = getattr(db_models.ProcStationGridData, db_column_name)
+        for year in years:
+            # 每个(要素, 年份)一个EXISTS子查询, 只检查一条记录是否存在
+            exists_columns.append(
+                exists().where(
+                    db_models.ProcStationGridData.year == int(year),
+                    db_column.isnot(None)
+                ).label(f"e{len(combos)}")
+            )
+            combos.append((element, int(year)))
+    if not combos:
+        return set()
+    # 所有EXISTS子查询放在同一条SELECT中, 只访问一次数据库
+    row = db.execute(select(*exists_columns)).one()
+    return {combo for combo, existed in zip(combos, row) if existed}
+
 """--------------------模型训练--------------------"""
 def get_proc_data_to_build_dataset(db: Session, element: str, start_year: str, end_year: str):
     """根据起止年份从数据库中获取指定要素的sg数据"""
@@ -430,6 +552,18 @@ def get_all_model_records(db: Session) -> List[db_models.ModelRecord]:
     return db.query(db_models.ModelRecord).order_by(db_models.ModelRecord.create_time.desc()).all()
 
 """--------------------数据透视--------------------"""
+def get_model_records_by_element_season(db: Session, element: str, season: str) -> List[db_models.ModelRecord]:
+    """
+    按要素和季节筛选模型记录(在SQL中完成, 不必逐条解析训练参数)。
+    指定具体季节时匹配该季节和全年模型, 指定全年时只匹配全年模型。
+    """
+    record_season = func.json_extract(db_models.ModelRecord.train_params, "$.season")
+    seasons = [season, "全年"] if season != "全年" else ["全年"]
+    return db.query(db_models.ModelRecord).filter(
+        db_models.ModelRecord.element == element,
+        record_season.in_(seasons)
+    ).order_by(db_models.ModelRecord.create_time.desc()).all()
+
 def get_proc_data_for_pivot(db: Session, name_to_id_mapping: pd.DataFrame, element: str, station_name: str, start_time: datetime, end_time: datetime):
     """查询指定要素、站点、时间范围内的站点观测值和格点值"""
     try:
@@ -1,7 +1,7 @@
 # src/db/database.py
 
 from pathlib import Path
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -39,6 +39,18 @@ Base = declarative_base()
 def create_db_and_tables():
     # 这个函数将在main.py中被调用
     Base.metadata.create_all(bind=engine)
+    _add_task_file_name_column()
+
+def _add_task_file_name_column():
+    """为旧版数据库的task_progress表补充file_name生成列及其索引(create_all不会修改已存在的表)"""
+    with engine.begin() as conn:
+        columns = [row[1] for row in conn.execute(text("PRAGMA table_xinfo(task_progress)"))]
+        if "file_name" not in columns:
+            conn.execute(text(
+                "ALTER TABLE task_progress ADD COLUMN file_name VARCHAR "
+                "GENERATED ALWAYS AS (json_extract(task_params, '$.file_name')) VIRTUAL"
+            ))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_task_progress_file_name ON task_progress (file_name)"))
 
 # 依赖注入函数，用于在FastAPI路由中获取数据库会话
 def get_db():
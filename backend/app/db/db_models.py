@@ -1,7 +1,7 @@
 # src/db/db_models.py
 import json
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, UniqueConstraint, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, UniqueConstraint, ForeignKey, Computed
 from .database import Base
 
 
@@ -76,6 +76,8 @@ class TaskProgress(Base):
     start_time = Column(DateTime, default=datetime.now(), comment="任务开始时间")
     end_time = Column(DateTime, nullable=True, comment="任务结束时间")
     task_params = Column(Text, comment="任务参数的JSON字符串")
+    # 由SQLite JSON1在数据库端从task_params中提取的文件名(虚拟生成列+索引), 用于按文件名查询子任务
+    file_name = Column(String, Computed("json_extract(task_params, '$.file_name')", persisted=False), index=True, comment="任务参数中的文件名")
     cur_progress = Column(Float, default=0.0, comment="当前进度(0.0 to 100.0)")
     progress_text = Column(String, default="任务已提交, 等待执行...", comment="任务进度的文字描述")
 
@@ -8,6 +8,7 @@ from app.api.routers import (
     data_process, model_train, data_correct, data_pivot, multi_station_eval
 )
 from app.core.config import STOP_EVENT
+from app.utils.export_pool import shutdown_export_pool
 
 
 @asynccontextmanager
@@ -24,6 +25,7 @@ async def lifespan(app: FastAPI):
         # 在应用关闭时清理资源
         print("应用关闭...发送停止信号给后台任务...")
         STOP_EVENT.set()
+        shutdown_export_pool()  # 关闭图像导出共用的绘图进程
         print("应用已关闭...")
 
 # 创建FastAPI应用实例
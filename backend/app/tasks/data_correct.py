@@ -3,29 +3,153 @@ import os
 import gc
 import math
 import uuid
+import threading
+import multiprocessing
+import netCDF4
 import numpy as np
 import xarray as xr
+from xarray.backends.netCDF4_ import NETCDF4_PYTHON_LOCK
 from pathlib import Path
 from typing import Dict, Optional
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.util import Finalize
+from time import sleep
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from ..db import crud
 from ..db.database import SessionLocal
 from ..core.config import settings, STOP_EVENT
 from ..core.data_mapping import ELEMENT_TO_NC_MAPPING, NC_TO_DB_MAPPING
-from ..core.data_correct import build_feature_for_block
+from ..core.data_correct import build_feature_for_block, get_block_feature_columns, load_lag_arrays
 from ..utils.file_io import load_model, get_grid_files_for_season, create_file_packages
 
 
 # 定义使用残差模式的要素列表
 RESIDUAL_ELEMENTS = ["温度", "相对湿度", "过去1小时降水量"]
+# 单个文件内并行处理纬向条带的最大线程数(实际线程数按工作进程数均分CPU核心)
+BAND_THREADS = 4
+# 订正结果的量化存储编码(网格数据中温度单位为℃, 因此不需要开尔文偏移), 降水量用int32避免溢出
+OUTPUT_QUANTIZATION = {
+    "tmp": {"dtype": "int16", "scale_factor": 0.01, "add_offset": 0.0, "_FillValue": np.int16(-32768)},
+    "rh": {"dtype": "int16", "scale_factor": 0.01, "add_offset": 0.0, "_FillValue": np.int16(-32768)},
+    "pre": {"dtype": "int32", "scale_factor": 0.001, "add_offset": 0.0, "_FillValue": np.int32(-2147483648)},
+    "wind_velocity": {"dtype": "int16", "scale_factor": 0.01, "add_offset": 0.0, "_FillValue": np.int16(-32768)}
+}
+
+# 工作进程内的共享资源(由_init_worker在每个工作进程启动时加载一次)
+_MODEL = None
+_DEM = None
+_DB = None
+_BAND_THREADS = 1
+# 工作进程内的后台写文件线程, 以及上一个文件尚未完成的写入
+_WRITE_POOL = None
+_PENDING_WRITE = None
+# 主进程与工作进程共享的进度数组(每个文件一个槽位), 由主进程的汇报线程统一写入数据库:
+# 订正过程中为0-99的整数进度, 文件写入完成后为PROGRESS_WRITTEN, 写入失败为PROGRESS_WRITE_FAILED
+_PROGRESS = None
+PROGRESS_WRITTEN = 100
+PROGRESS_WRITE_FAILED = -1
+# 汇报线程将进度写入数据库的时间间隔(秒)
+PROGRESS_FLUSH_INTERVAL = 1.0
+# 主进程等待最后一批文件写入完成时的轮询间隔(秒)
+WRITE_WAIT_INTERVAL = 0.2
+
+def _init_worker(model_path: str, dem_path: str, shared_progress, band_threads: int):
+    """进程池初始化函数: 每个工作进程只加载一次模型和dem文件, 避免每个任务都序列化传输大对象"""
+    global _MODEL, _DEM, _DB, _WRITE_POOL, _PROGRESS, _BAND_THREADS
+    _PROGRESS = shared_progress
+    _BAND_THREADS = band_threads
+    # 每个工作进程复用同一个数据库会话, 处理所有文件时不再反复创建/关闭
+    _DB = SessionLocal()
+    _WRITE_POOL = ThreadPoolExecutor(max_workers=1)
+    # 工作进程退出时关闭数据库会话(进程池的工作进程不会执行atexit等退出清理)
+    Finalize(None, _DB.close, exitpriority=1)
+    _MODEL = load_model(model_path)
+    # 文件内已按条带多线程并行, 模型预测使用单线程以避免线程超额订阅
+    if hasattr(_MODEL, "set_params"):
+        _MODEL.set_params(n_jobs=1)
+    # dem读入内存, 供多个线程并发查询
+    _DEM = xr.open_dataset(dem_path).load()
+
+def _mask_out_of_range(data: np.ndarray, quantization: Dict, nc_var: str, output_path: Path) -> np.ma.MaskedArray:
+    """
+    将NaN以及超出量化整数可表示范围的订正值屏蔽为缺测值(netCDF4打包时超出范围的值会整数溢出成错误的数值)。
+    存在超出范围的值时打印警告。
+    """
+    int_info = np.iinfo(quantization["dtype"])
+    scale_factor, add_offset = quantization["scale_factor"], quantization["add_offset"]
+    # 整数类型的最小值留作_FillValue, 有效打包值为[min+1, max]
+    lower = add_offset + (int_info.min + 1) * scale_factor
+    upper = add_offset + int_info.max * scale_factor
+    masked_data = np.ma.masked_invalid(data)
+    out_of_range = ((masked_data < lower) | (masked_data > upper)).filled(False)
+    out_of_range_count = int(out_of_range.sum())
+    if out_of_range_count:
+        print(f"|--> 警告: {output_path.name} 中有 {out_of_range_count} 个 {nc_var} 订正值超出量化存储范围 [{lower:.2f}, {upper:.2f}], 已写为缺测值")
+        masked_data[out_of_range] = np.ma.masked
+    return masked_data
+
+def _write_nc(output_path: Path, nc_var: str, data: np.ndarray, coords: Dict, chunksizes: tuple):
+    """
+    直接使用netCDF4写出订正结果, 跳过xarray的编码与引擎分发开销。
+    数据按(time, lat, lon)分块+shuffle+zlib压缩, 并按要素量化为整数存储(读取时由scale_factor/add_offset自动还原)。
+
+    :param output_path: 输出文件路径.
+    :param nc_var: 变量名.
+    :param data: 订正结果, 形状为(time, lat, lon).
+    :param coords: {维度名: (坐标值, 坐标属性)}.
+    :param chunksizes: 数据变量的分块形状.
+    """
+    quantization = OUTPUT_QUANTIZATION.get(nc_var)
+    if quantization:
+        # 在加锁之前完成缺测值和超范围值的屏蔽, 不占用HDF5锁
+        data = _mask_out_of_range(data, quantization, nc_var, output_path)
+    # HDF5库并非线程安全, 直接使用xarray的netCDF4后端锁(与xarray的加锁顺序一致, 避免与主线程读取下一个文件时互相等待而死锁)
+    with NETCDF4_PYTHON_LOCK, netCDF4.Dataset(output_path, "w", format="NETCDF4") as nc:
+        for dim, (values, attrs) in coords.items():
+            nc.createDimension(dim, values.size)
+            coord_var = nc.createVariable(dim, values.dtype, (dim,))
+            coord_var.setncatts({k: v for k, v in attrs.items() if k != "_FillValue"})
+            coord_var[:] = values
+
+        if quantization:
+            var = nc.createVariable(
+                nc_var, quantization["dtype"], ("time", "lat", "lon"), fill_value=quantization["_FillValue"],
+                zlib=True, complevel=1, shuffle=True, chunksizes=chunksizes
+            )
+            # 设置scale_factor/add_offset后, netCDF4在写入时自动完成打包和取整
+            var.scale_factor = quantization["scale_factor"]
+            var.add_offset = quantization["add_offset"]
+            # NaN格点以及超出量化范围的格点写为缺测值
+            var[:] = data
+        else:
+            var = nc.createVariable(
+                nc_var, data.dtype, ("time", "lat", "lon"), fill_value=np.float32(np.nan),
+                zlib=True, complevel=1, shuffle=True, chunksizes=chunksizes
+            )
+            var[:] = data
+
+def _write_nc_and_report(file_index: int, output_path: Path, nc_var: str, data: np.ndarray, coords: Dict, chunksizes: tuple):
+    """[后台写文件线程] 写出订正结果, 并通过共享进度数组把写入结果告知主进程(由主进程写入子任务的最终状态)"""
+    try:
+        _write_nc(output_path, nc_var, data, coords, chunksizes)
+    except Exception as e:
+        print(f"|--> 写入订正文件 {output_path} 失败: {e}")
+        _PROGRESS[file_index] = PROGRESS_WRITE_FAILED
+    else:
+        _PROGRESS[file_index] = PROGRESS_WRITTEN
 
 def correct_single_file(
-        model: object, dem_ds: xr.Dataset, file_package: Dict, 
-        element: str, year: str, block_size: int, sub_task_id: str
+        file_package: Dict, element: str, year: str, block_size: int, sub_task_id: str, file_index: int
 ) -> Optional[Path]:
     """订正单个nc文件, 生成一张订正后的nc文件[原子性任务]"""
-    db = SessionLocal()
+    global _PENDING_WRITE
+    db, model, dem_ds = _DB, _MODEL, _DEM
     try:
+        # 等待上一个文件的后台写入完成(背压: 最多只有一个文件在写; 写入结果已由写文件线程汇报)
+        if _PENDING_WRITE is not None:
+            _PENDING_WRITE.result()
+            _PENDING_WRITE = None
+
         # 更新子任务状态为: PROCESSING
         crud.update_task_status(db, sub_task_id, "PROCESSING", 0.0, "开始处理...")
 
@@ -34,85 +158,139 @@ def correct_single_file(
         timestamp = file_package["timestamp"]
         lag_files = file_package["lag_files"]   # dict
 
-        # 加载当前时刻的格点数据
-        grid_ds = xr.open_dataset(current_file)
-        # 创建一个空的、与输入数据同样大小和坐标的结果数组
-        corrected_data = np.full_like(grid_ds[nc_var].values, np.nan, dtype=np.float32)\
+        # 加载当前时刻的格点数据(时间坐标仅原样写回输出文件, 无需CF时间解码)
+        grid_ds = xr.open_dataset(current_file, decode_times=False)
+        # 一次性将当前时次的整幅格点读入内存, 后续各条带直接在内存中切片
+        grid_da = grid_ds[nc_var][0].load()
+        # 一次性读取所有滞后文件, 各条带复用
+        lag_arrays = load_lag_arrays(lag_files, element)
+        # 创建与输入数据同样大小的结果数组: 各纬向条带覆盖全部格点且会逐一回填, 无需预先填充NaN
+        # (任一条带失败都会使整个文件失败, 不会写出未初始化的数据)
+        corrected_data = np.empty((1,) + grid_da.shape, dtype=np.float32)
         
-        # 计算总块数用于进度汇报
+        # 按纬向条带处理: 每个条带包含block_size行纬度上横跨整个经度范围的所有空间块,
+        # 条带内的所有块合并为一次model.predict调用, 摊薄每次预测的固定开销
         lat_size, lon_size = grid_ds.sizes["lat"], grid_ds.sizes["lon"]
-        total_blocks = math.ceil(lat_size / block_size) * math.ceil(lon_size / block_size)
-        processed_blocks = 0
-
-        # 对每个空间块进行处理
-        for lat_start in range(0, lat_size, block_size):
-            for lon_start in range(0, lon_size, block_size):
-                lat_end = min(lat_start + block_size, lat_size)
-                lon_end = min(lon_start + block_size, lon_size)
-                
-                # 获取当前空间块的数据
-                grid_block_ds = grid_ds[nc_var][0, lat_start:lat_end, lon_start:lon_end]
-                # 为当前空间块构建特征
-                feature_df = build_feature_for_block(
-                    grid_block_ds, dem_ds, lag_files, element, timestamp
-                )
-
-                # 使用模型进行预测
-                pred_raw = model.predict(feature_df)
-                
-                # 根据订正模式计算最终结果
-                if element in RESIDUAL_ELEMENTS:
-                    # 获取当前块的原始格点值用于加残差
-                    # 确定特征df中对应的格点列名
-                    db_var = NC_TO_DB_MAPPING[nc_var]
-                    grid_col_name = f"{db_var}_grid"
-                    original_grid_values = feature_df[grid_col_name].values
-                    
-                    # 最终值 = 原始格点值 + 预测残差
-                    corrected_block_values = original_grid_values + pred_raw
-                else:
-                    # 直接预测模式
-                    corrected_block_values = pred_raw
+        band_size = min(block_size, lat_size)
+        total_bands = math.ceil(lat_size / band_size)
+        processed_bands = 0
+
+        feature_columns = get_block_feature_columns(element)
+        grid_col_index = feature_columns.index(f"{NC_TO_DB_MAPPING[nc_var]}_grid")
+        # 每个线程预分配一个特征缓冲区, 在该线程处理的所有条带间复用(最后一个条带使用其前若干行的视图)
+        thread_local = threading.local()
+
+        def _process_band(lat_start: int):
+            """构建单个纬向条带的特征并预测, 结果回填到corrected_data中互不重叠的区域"""
+            if not hasattr(thread_local, "feature_buffer"):
+                thread_local.feature_buffer = np.empty((band_size * lon_size, len(feature_columns)), dtype=np.float32)
+            lat_end = min(lat_start + band_size, lat_size)
+            
+            # 获取当前条带的数据
+            grid_band_ds = grid_da[lat_start:lat_end, :]
+            # 为当前条带构建特征(原地填充到特征缓冲区)
+            features = build_feature_for_block(
+                grid_band_ds, dem_ds, lag_arrays, element, timestamp, out=thread_local.feature_buffer
+            )
+
+            # 使用模型对整个条带一次性预测(特征矩阵列顺序与训练时一致, 跳过特征名校验)
+            pred_raw = model.predict(features, validate_features=False)
+            
+            # 根据订正模式计算最终结果
+            if element in RESIDUAL_ELEMENTS:
+                # 最终值 = 原始格点值 + 预测残差
+                corrected_band_values = features[:, grid_col_index] + pred_raw
+            else:
+                # 直接预测模式
+                corrected_band_values = pred_raw
 
-                # 回填结果
-                corrected_nc_data = corrected_block_values.reshape(grid_block_ds.shape)
-                corrected_data[0, lat_start:lat_end, lon_start:lon_end] = corrected_nc_data
+            # 回填结果
+            corrected_data[0, lat_start:lat_end, :] = corrected_band_values.reshape(grid_band_ds.shape)
 
-                del feature_df, pred_raw, corrected_block_values, corrected_nc_data
-                gc.collect()
+        # 使用线程池并行处理各纬向条带(模型预测在C++中执行并释放GIL), 进度在当前线程中汇报
+        with ThreadPoolExecutor(max_workers=_BAND_THREADS) as band_pool:
+            band_futures = [band_pool.submit(_process_band, lat_start) for lat_start in range(0, lat_size, band_size)]
+            for band_future in as_completed(band_futures):
+                band_future.result()
 
-                # 汇报进度
-                processed_blocks += 1
-                progress = (processed_blocks / total_blocks) * 100
-                progress_text = f"正在处理: {processed_blocks}/{total_blocks} 块"
-                crud.update_task_status(db, sub_task_id, "PROCESSING", progress, progress_text)
+                # 汇报进度: 只写入共享内存, 由主进程的汇报线程统一写入数据库
+                processed_bands += 1
+                _PROGRESS[file_index] = int(processed_bands * 99 / total_bands) # 100留给文件写入完成
 
         # 保存订正后的nc文件
         output_path = Path(settings.CORRECTION_OUTPUT_DIR) / f"{nc_var}.hourly" / year / f"corrected.{current_file.name}"
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # 创建一个新的xarray.Dataset来保存结果
-        corrected_ds = xr.Dataset(
-            {nc_var: (["time", "lat", "lon"], corrected_data)},
-            coords={"time": grid_ds.time, "lat": grid_ds.lat, "lon": grid_ds.lon}
+        # 坐标(原始数值及属性)在关闭输入文件前取出, 交给后台线程直接用netCDF4写入
+        coords = {dim: (grid_ds[dim].values, dict(grid_ds[dim].attrs)) for dim in ("time", "lat", "lon")}
+        chunksizes = (1, min(256, lat_size), min(256, lon_size))
+        # 在后台线程中写文件, 使本进程可以立即开始处理下一个文件
+        # (写入完成或失败后由写文件线程更新共享进度数组, 主进程据此写入子任务的最终状态)
+        _PENDING_WRITE = _WRITE_POOL.submit(
+            _write_nc_and_report, file_index, output_path, nc_var, corrected_data, coords, chunksizes
         )
-        corrected_ds.to_netcdf(output_path)
         grid_ds.close()
         
         # 释放内存
-        del corrected_ds, corrected_data, grid_ds
+        del corrected_data, grid_ds, lag_arrays
         gc.collect()
         return output_path
         
     except Exception as e:
+        # 会话在进程内复用, 先回滚可能未完成的事务, 避免影响后续文件
+        db.rollback()
         error_msg = f"子进程错误: {e}"
         crud.update_task_status(db, sub_task_id, "FAILED", 0, error_msg)
         print(f"|--> 处理文件 {current_file} 失败: {e}")
         gc.collect()
         return None
+
+def _progress_dumper(shared_progress, sub_task_ids: list, file_names: list, stop_event: threading.Event):
+    """
+    [主进程汇报线程] 定期读取共享进度数组, 将有变化的子任务进度在一个事务中批量写入数据库;
+    文件写入完成/失败后及时将子任务标记为COMPLETED/FAILED。收到停止信号后再汇报一次, 不遗漏最后的写入结果。
+    """
+    db = SessionLocal()
+    last_progress = [0] * len(sub_task_ids)
+    try:
+        while True:
+            stopped = stop_event.wait(PROGRESS_FLUSH_INTERVAL)
+            current_progress = shared_progress[:]
+            progress_updates = {}
+            try:
+                for file_index, progress in enumerate(current_progress):
+                    if progress == last_progress[file_index]:
+                        continue
+                    sub_task_id = sub_task_ids[file_index]
+                    if progress == PROGRESS_WRITTEN:
+                        crud.update_task_status(db, sub_task_id, "COMPLETED", 100.0, f"当前文件订正完成: corrected.{file_names[file_index]}")
+                    elif progress == PROGRESS_WRITE_FAILED:
+                        crud.update_task_status(db, sub_task_id, "FAILED", 0.0, f"写入订正文件失败: corrected.{file_names[file_index]}")
+                    else:
+                        progress_updates[sub_task_id] = (float(progress), f"正在处理: {progress}%")
+                crud.bulk_update_task_progress(db, progress_updates)
+                last_progress = current_progress
+            except Exception as e:
+                db.rollback()
+                print(f"|--> 主进程: 写入子任务进度失败: {e}")
+            if stopped:
+                break
     finally:
         db.close()
 
+def _wait_written_files(executor: ProcessPoolExecutor, shared_progress, file_indices: list):
+    """等待各文件的后台写入结束(写入完成或失败); 进程池损坏(工作进程异常退出)或收到停止信号时不再等待"""
+    while any(shared_progress[i] not in (PROGRESS_WRITTEN, PROGRESS_WRITE_FAILED) for i in file_indices):
+        if STOP_EVENT.is_set():
+            return
+        try:
+            # 向进程池提交一个空任务: 工作进程异常退出后进程池已损坏, 提交时立即抛出BrokenProcessPool
+            executor.submit(int).result()
+        except BrokenProcessPool:
+            print(f"|--> 主进程: 进程池已损坏, 不再等待剩余文件写入")
+            return
+        sleep(WRITE_WAIT_INTERVAL)
+
 def correct_mp(
         parent_task_id: str, model_path: str, element: str, start_year: str, end_year: str, 
         season: str, block_size: int, num_workers: int
@@ -121,6 +299,8 @@ def correct_mp(
     db = SessionLocal()
     cancel_request = False
     executor = None
+    dumper_stop_event = threading.Event()
+    dumper_thread = None
 
     try:
         crud.update_task_status(db, parent_task_id, "PROCESSING", 0, "正在初始化任务...")
@@ -129,13 +309,18 @@ def correct_mp(
         # 检测CPU核心数, 如果用户指定的工作进程数大于CPU核心数, 则使用CPU核心数
         cpu_count = os.cpu_count()
         num_workers = min(num_workers, cpu_count - 1) if cpu_count > 1 else 1
+        # GPU推理时所有工作进程共享同一块显存, 限制进程数以免显存不足
+        if settings.PREDICT_DEVICE.startswith("cuda"):
+            num_workers = min(num_workers, 2)
         print(f"|--> 主进程: 检测到 CPU 核心数: {cpu_count}, 将使用 {num_workers} 个工作进程")
 
-        # 主进程中加载共享资源(模型和dem文件)
-        crud.update_task_status(db, parent_task_id, "PROCESSING", 1, "正在加载模型、地形资源...")
-        model = load_model(model_path)
-        dem_ds = xr.open_dataset(settings.DEM_DATA_PATH)
-        crud.update_task_status(db, parent_task_id, "PROCESSING", 2, "模型、地形资源加载完成")
+        # 检查共享资源(模型和dem文件), 实际加载由每个工作进程的初始化函数完成
+        crud.update_task_status(db, parent_task_id, "PROCESSING", 1, "正在检查模型、地形资源...")
+        if not Path(model_path).exists():
+            raise FileNotFoundError(f"模型文件不存在: {model_path}")
+        if not Path(settings.DEM_DATA_PATH).exists():
+            raise FileNotFoundError(f"地形文件不存在: {settings.DEM_DATA_PATH}")
+        crud.update_task_status(db, parent_task_id, "PROCESSING", 2, "模型、地形资源检查完成")
 
         # 准备需要的文件列表
         crud.update_task_status(db, parent_task_id, "PROCESSING", 3, "正在准备文件列表...")
@@ -159,62 +344,107 @@ def correct_mp(
             print(f"|--> 主进程: 没有需要订正的文件")
             return
         
+        # 为每个文件创建子任务(在一个事务中批量创建, 只提交一次)
         sub_tasks = {}
+        sub_task_specs = []
         for file_package in file_packages:
             sub_task_id = str(uuid.uuid4())
             file_name = file_package["current_file"].name
             sub_task_name = f"订正文件_{file_name}"
             params = {"file_name": file_name, "timestamp": file_package["timestamp"].isoformat()}
-            crud.create_task(db, sub_task_id, sub_task_name, "DataCorrect_SubTask", params, parent_task_id)
+            sub_task_specs.append((sub_task_id, sub_task_name, "DataCorrect_SubTask", params))
             sub_tasks[file_name] = sub_task_id
+        crud.bulk_create_tasks(db, sub_task_specs, parent_task_id=parent_task_id)
         crud.update_task_status(db, parent_task_id, "PROCESSING", 5, f"子任务分配完成, 准备处理 {total_files} 个任务")
 
         completed_files = 0
-        executor = ProcessPoolExecutor(max_workers=num_workers)
+        # 子任务进度通过共享内存传递给主进程, 由单个汇报线程每秒批量写入一次数据库
+        shared_progress = multiprocessing.Array("i", total_files)
+        sub_task_ids = [sub_tasks[file_package["current_file"].name] for file_package in file_packages]
+        dumper_thread = threading.Thread(
+            target=_progress_dumper, daemon=True,
+            args=(shared_progress, sub_task_ids, [fp["current_file"].name for fp in file_packages], dumper_stop_event)
+        )
+        dumper_thread.start()
+        # 各工作进程均分CPU核心作为条带线程数, 避免工作进程数 x 条带线程数超出核心数
+        band_threads = max(1, min(BAND_THREADS, cpu_count // num_workers))
+        print(f"|--> 主进程: 每个工作进程使用 {band_threads} 个条带线程")
+        # 每个工作进程在启动时加载一次模型和dem, 提交任务时只传递文件包和任务ID
+        executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            initializer=_init_worker,
+            initargs=(model_path, settings.DEM_DATA_PATH, shared_progress, band_threads)
+        )
 
         # 提交所有任务到进程池
         futures = {
             executor.submit(
-                correct_single_file, model, dem_ds, file_package, element, 
+                correct_single_file, file_package, element, 
                 file_package["current_file"].parent.name, block_size, 
-                sub_tasks[file_package["current_file"].name]
-            ): file_package for file_package in file_packages
+                sub_task_ids[file_index], file_index
+            ): file_index for file_index, file_package in enumerate(file_packages)
         }
         print(f"|--> 主进程: 提交了 {len(futures)} 个订正任务到进程池")
 
         # 处理已经完成的任务
+        progress_updater = crud.ThrottledStatusUpdater(db, parent_task_id)
+        written_file_indices = [] # 订正完成、已提交写文件的文件序号
         for future in as_completed(futures):
             if STOP_EVENT.is_set():
                 cancel_request = True
                 print(f"|--> 主进程: 收到停止信号, 开始终止任务")
                 break
 
-            file_package = futures[future]
+            file_index = futures[future]
+            file_package = file_packages[file_index]
             original_file_name = file_package["current_file"].name
             sub_task_id = sub_tasks[original_file_name]
 
             try:
                 result_path = future.result()
                 if result_path:
-                    crud.update_task_status(db, sub_task_id, "COMPLETED", 100.0, f"当前文件订正完成: {result_path.name}")
+                    # 订正结果已提交给工作进程的后台线程写出, 文件写完后由汇报线程将子任务标记为COMPLETED
+                    written_file_indices.append(file_index)
                     print(f"|--> [成功]: {original_file_name} -> {result_path}")
                 else:
-                    crud.update_task_status(db, sub_task_id, "FAILED", 0.0, f"当前文件订正失败: {result_path.name}")
+                    crud.update_task_status(db, sub_task_id, "FAILED", 0.0, f"当前文件订正失败: {original_file_name}")
                     print(f"|--> [失败]: {original_file_name}")
             except Exception as e:
-                crud.update_task_status(db, sub_task_id, "FAILED", 0.0, f"错误: {result_path.name}")
+                crud.update_task_status(db, sub_task_id, "FAILED", 0.0, f"错误: {original_file_name}: {e}")
                 print(f"|--> [错误]: 处理 {original_file_name} 时出错: {e}")
 
             completed_files += 1
             progress = (completed_files / total_files) * 100
             progress_text = f"整体进度: {completed_files}/{total_files}"
-            crud.update_task_status(db, parent_task_id, "PROCESSING", progress, progress_text)
+            # 父任务的整体进度按时间节流写入数据库(子任务的完成状态仍逐个写入)
+            progress_updater.update("PROCESSING", progress, progress_text)
             print(f"|--> 进度: {completed_files}/{total_files} ({progress:.2f}%)")
 
         if STOP_EVENT.is_set():
             crud.update_task_status(db, parent_task_id, "FAILED", progress, "任务被用户手动停止")
         else:
-            crud.update_task_status(db, parent_task_id, "COMPLETED", 100.0, "所有订正任务已完成")
+            # 等待各工作进程的后台线程写完最后的文件(写入结果通过共享进度数组汇报), 再确定父任务状态
+            crud.update_task_status(db, parent_task_id, "PROCESSING", 100.0, "正在等待订正文件写入完成...")
+            print(f"|--> 主进程: 等待订正文件写入完成...")
+            _wait_written_files(executor, shared_progress, written_file_indices)
+            # 停止汇报线程(停止前会最后汇报一次, 已写完的子任务均标记为COMPLETED/FAILED)
+            dumper_stop_event.set()
+            dumper_thread.join()
+            if STOP_EVENT.is_set():
+                cancel_request = True
+                crud.update_task_status(db, parent_task_id, "FAILED", 100.0, "任务被用户手动停止")
+                return
+            # 任一文件写入失败(或工作进程异常退出未写完)时父任务失败
+            unwritten_indices = [i for i in written_file_indices if shared_progress[i] != PROGRESS_WRITTEN]
+            unwritten_count = len(unwritten_indices)
+            for file_index in unwritten_indices:
+                if shared_progress[file_index] != PROGRESS_WRITE_FAILED:
+                    crud.update_task_status(db, sub_task_ids[file_index], "FAILED", 0.0, "订正文件未能写入完成")
+            if unwritten_count:
+                crud.update_task_status(db, parent_task_id, "FAILED", 100.0, f"有 {unwritten_count} 个订正文件写入失败")
+                print(f"|--> 主进程: 有 {unwritten_count} 个订正文件写入失败")
+            else:
+                crud.update_task_status(db, parent_task_id, "COMPLETED", 100.0, "所有订正任务已完成")
         
     except Exception as e:
         error_msg = f"任务执行错误: {e}"
@@ -227,6 +457,9 @@ def correct_mp(
             print(f"|--> 主进程: 开始关闭进程池...")
             executor.shutdown(wait=True, cancel_futures=True)
             print(f"|--> 主进程: 进程池已关闭")
+        if dumper_thread:
+            dumper_stop_event.set()
+            dumper_thread.join()
         if cancel_request:
             print(f"|--> 主进程: 正在更新任务 {parent_task_id} 以及剩余子任务的状态为 FAILED...")
             crud.cancel_subtask(db, parent_task_id)
@@ -1,18 +1,50 @@
 # src/tasks/data_import.py
+import os
 import uuid
-import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 from pathlib import Path
 from sqlalchemy.orm import Session
 from ..db import crud
 from ..db.database import SessionLocal
-from ..core.data_mapping import RAW_STATION_DATA_TO_DB_MAPPING, REQUIRED_COLUMNS
+from ..core.data_mapping import RAW_STATION_DATA_TO_DB_MAPPING, REQUIRED_COLUMNS, build_timestamps
 from ..core.config import STOP_EVENT
 
 
+# 流式读取csv时每个数据块的字节数(约5万行, 与原先按行分块的规模相当)
+CSV_BLOCK_SIZE = 4 << 20
+# 显式指定csv各列类型, 避免流式读取时仅根据第一个数据块推断类型导致后续数据块类型冲突
+CSV_COLUMN_TYPES = {
+    "区站号(数字)": pa.int64(),
+    "站名": pa.string(),
+    "纬度": pa.float64(),
+    "经度": pa.float64(),
+    "年": pa.int64(),
+    "月": pa.int64(),
+    "日": pa.int64(),
+    "时": pa.int64(),
+    "温度/气温": pa.float64(),
+    "相对湿度": pa.float64(),
+    "过去1小时降水量": pa.float64(),
+    "2分钟平均风速": pa.float64()
+}
+
+# 小于该字节数的文件精确计数, 否则按采样估算行数
+EXACT_COUNT_MAX_BYTES = 2 << 20
+SAMPLE_BYTES = 1 << 20
+
 def _count_lines_in_file(file_path: Path) -> int:
-    """快速计算文件行数(不含表头)"""
-    with open(file_path, "r", encoding="utf-8") as f:
-        return sum(1 for _ in f) - 1
+    """快速计算文件行数(不含表头): 小文件精确计数, 大文件根据前1MB的平均行长和文件大小估算"""
+    file_size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        if file_size < EXACT_COUNT_MAX_BYTES:
+            return max(sum(1 for _ in f) - 1, 0)
+        sample = f.read(SAMPLE_BYTES)
+    n_newlines = sample.count(b"\n")
+    if n_newlines == 0:
+        return 1
+    avg_row_bytes = len(sample) / n_newlines
+    return max(int(file_size / avg_row_bytes) - 1, 1)
 
 def run_station_data_import(task_id: str, dir: str):
     """
@@ -62,16 +94,12 @@ def run_station_data_import(task_id: str, dir: str):
         total_tasks_to_run = len(files_to_process)
         print(f"|--> 本次任务需处理 {total_tasks_to_run} 个新文件 (已跳过 {skipped_count} 个)。")
 
-        # 3. 为需要处理的文件创建子任务
-        for file_path in files_to_process:
-            sub_task_id = str(uuid.uuid4())
-            sub_task_name = f"导入文件: {file_path.name}"
-            sub_task = crud.create_task(
-                db, task_id=sub_task_id, task_name=sub_task_name,
-                task_type="DataImport_SubTask", params={"file_name": file_path.name},
-                parent_task_id=task_id 
-            )
-            sub_tasks.append(sub_task)
+        # 3. 为需要处理的文件创建子任务(在一个事务中批量创建, 只提交一次)
+        sub_task_specs = [
+            (str(uuid.uuid4()), f"导入文件: {file_path.name}", "DataImport_SubTask", {"file_name": file_path.name})
+            for file_path in files_to_process
+        ]
+        sub_tasks = crud.bulk_create_tasks(db, sub_task_specs, parent_task_id=task_id)
         
         # 更新父任务状态, 进度=已跳过/总数
         initial_progress = (skipped_count / total_files) * 100
@@ -80,7 +108,6 @@ def run_station_data_import(task_id: str, dir: str):
 
         # 循环处理每个文件(子任务)
         completed_count = 0
-        CHUNK_SIZE = 50000
         for i, sub_task in enumerate(sub_tasks):
             # 在处理每个文件前, 检查停止信号
             if STOP_EVENT.is_set():
@@ -93,7 +120,7 @@ def run_station_data_import(task_id: str, dir: str):
             rows_processed = 0
             
             try:
-                # 获取文件总行数, 用于精确计算进度
+                # 获取文件总行数(大文件为估算值), 用于计算进度
                 total_rows = _count_lines_in_file(Path(file_path))
 
                 if total_rows == 0:
@@ -106,18 +133,26 @@ def run_station_data_import(task_id: str, dir: str):
                 crud.update_task_status(db, sub_task.task_id, "PROCESSING", 0.0, "开始处理文件...")
                 print(f"|--> 开始处理文件 {file_name}")
 
-                # 使用read_csv的chunksize参数创建迭代器
-                df_iterator = pd.read_csv(file_path, usecols=REQUIRED_COLUMNS, chunksize=CHUNK_SIZE)
+                progress_updater = crud.ThrottledStatusUpdater(db, sub_task.task_id)
+                # 使用pyarrow的多线程csv读取器流式解码, 逐个RecordBatch处理
+                reader = pa_csv.open_csv(
+                    file_path,
+                    read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+                    convert_options=pa_csv.ConvertOptions(include_columns=REQUIRED_COLUMNS, column_types=CSV_COLUMN_TYPES)
+                )
 
                 # 循环处理每个数据块
-                for df_chunk in df_iterator:
+                for batch in reader:
+                    df_chunk = batch.to_pandas()
                     if STOP_EVENT.is_set():
                         print(f"检测到关闭信号, 文件 {file_name} 处理中断")
                         crud.update_task_status(db, sub_task.task_id, "FAILED", (rows_processed / total_rows) * 100, "任务被用户中断")
                         print("|--> 任务被用户中断")
                     
                     df_renamed = df_chunk.rename(columns=RAW_STATION_DATA_TO_DB_MAPPING)
-                    df_renamed["timestamp"] = pd.to_datetime(df_renamed[["year", "month", "day", "hour"]])
+                    df_renamed["timestamp"] = build_timestamps(
+                        df_renamed["year"], df_renamed["month"], df_renamed["day"], df_renamed["hour"]
+                    )
 
                     final_columns = [
                         "station_id", "station_name", "lat", "lon", "timestamp", "year", "month", "day", "hour",
@@ -129,13 +164,13 @@ def run_station_data_import(task_id: str, dir: str):
 
                     # 更新进度
                     rows_processed += len(df_chunk)
-                    file_progress = (rows_processed / total_rows) * 100
-                    crud.update_task_status(db, sub_task.task_id, "PROCESSING", file_progress, f"已入库 {rows_processed}/{total_rows} 行")
-                    print(f"|--> 已入库 {rows_processed}/{total_rows} 行")
+                    file_progress = min((rows_processed / total_rows) * 100, 99.0)
+                    progress_updater.update("PROCESSING", file_progress, f"已入库 {rows_processed}/约{total_rows} 行")
+                    print(f"|--> 已入库 {rows_processed}/约{total_rows} 行")
                 
                 # 单个文件的所有数据块处理完毕, 更新子任务为 已完成"COMPLETED"
-                crud.update_task_status(db, sub_task.task_id, "COMPLETED", 100.0, f"文件导入成功，共 {total_rows} 行")
-                print(f"|--> 文件 {file_name} 导入成功，共 {total_rows} 行")
+                crud.update_task_status(db, sub_task.task_id, "COMPLETED", 100.0, f"文件导入成功，共 {rows_processed} 行")
+                print(f"|--> 文件 {file_name} 导入成功，共 {rows_processed} 行")
                 completed_count += 1
 
             except Exception as e:
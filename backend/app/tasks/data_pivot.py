@@ -1,4 +1,5 @@
 # src/tasks/data_pivot.py
+import os
 import json
 import shutil
 import zipfile
@@ -7,20 +8,29 @@ import matplotlib
 import numpy as np
 import pandas as pd
 import xarray as xr
-import geopandas as gpd
 import matplotlib.pyplot as plt
 from pathlib import Path
 from typing import List
 from datetime import datetime
-from matplotlib.ticker import FuncFormatter
+from itertools import repeat
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from ..db import crud
 from ..db.database import SessionLocal
 from ..core.config import settings
 from ..core.data_mapping import ELEMENT_TO_DB_MAPPING, ELEMENT_TO_NC_MAPPING, get_name_to_id_mapping
 from ..core.data_pivot import bulid_feature_for_pivot
-from ..utils.file_io import load_model, find_nc_file_for_timestamp, find_corrected_nc_file_for_timestamp
+from ..utils.file_io import load_model_cached, load_json, encode_result_blob, index_nc_files, write_file_to_zip, write_files_to_zip
+from ..utils.export_pool import map_in_export_pool
+from ..utils.plot_format import _FMT_LON, _FMT_LAT
+from ..utils.province_geo import load_province_geo, load_province_artists, get_hubei_mask
 from ..utils.metrics import cal_metrics, cal_comprehensive_score
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 matplotlib.use('Agg')  # 使用 'Agg' 后端, 适用于非GUI环境的后台任务
 plt.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
 plt.rcParams['axes.unicode_minus'] = False  # 用来正常显示负号
@@ -75,6 +85,50 @@ ELEMENT_BAR_MAPPING = {
 # 定义使用残差模式的要素列表
 RESIDUAL_ELEMENTS = ["温度", "相对湿度", "过去1小时降水量"] 
 
+# 并行加载/预测模型的线程数
+MODEL_LOAD_THREADS = 4
+# 直接存入任务参数的结果(json序列化后)的最大字节数, 超过时保存为本地文件
+RESULT_BLOB_MAX_BYTES = 1_000_000
+# 循环中两次写入任务进度的最小时间间隔(秒)
+PROGRESS_UPDATE_INTERVAL = 0.5
+# 模型排序时并行读取指标文件的线程数
+METRICS_READ_THREADS = 16
+# 绘图进程内复用的对比图(图、子图和网格对象), 由_render_compare_image在首次绘图时创建
+_COMPARE_FIGURE = None
+
+def _predict_one(model_path: str, X_arr: np.ndarray, grid_values: np.ndarray, y_true: np.ndarray, element: str, out: np.ndarray):
+    """加载单个模型并预测, 预测值直接写入out(预测矩阵中该模型的一行), 返回(模型名称, 评价指标)"""
+    model_name = Path(model_path).stem
+    model = load_model_cached(model_path)
+    pred_raw = model.predict(X_arr, validate_features=False)
+    # 判断是否需要还原残差
+    if element in RESIDUAL_ELEMENTS:
+        np.add(pred_raw, grid_values, out=out)
+    else:
+        out[:] = pred_raw
+    return model_name, cal_metrics(y_true, out)
+
+def _to_json_native(obj):
+    """json.dump的default回调: 将numpy数组/标量转换为python原生类型"""
+    if isinstance(obj, np.ndarray):
+        if np.issubdtype(obj.dtype, np.datetime64):
+            return np.datetime_as_string(obj, unit="s").tolist()
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"无法序列化的类型: {type(obj)}")
+
+def _results_to_json_bytes(results: dict) -> bytes:
+    """将结果序列化为json字节串: 安装了orjson时直接在C中序列化numpy数组, 否则退回标准库json"""
+    if orjson is not None:
+        return orjson.dumps(results, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(results, ensure_ascii=False, default=_to_json_native).encode("utf-8")
+
+def _dump_results_json(results: dict, output_path: Path):
+    """保存结果到json文件"""
+    with open(output_path, "wb") as f:
+        f.write(_results_to_json_bytes(results))
+
 def evaluate_model(task_id: str, element: str, station_name: str, start_time: datetime, end_time: datetime, model_paths: List[str]):
     """模型评估分析[后台任务]"""
     db = SessionLocal()
@@ -92,38 +146,52 @@ def evaluate_model(task_id: str, element: str, station_name: str, start_time: da
         
         crud.update_task_status(db, task_id, "PROCESSING", 20.0, "数据获取完成, 开始构建特征...")
         element_db_column = ELEMENT_TO_DB_MAPPING[element]
-        df_X, df_y = bulid_feature_for_pivot(df_base.copy(), element)
+        df_X, df_y = bulid_feature_for_pivot(df_base, element)
         crud.update_task_status(db, task_id, "PROCESSING", 40.0, "特征构建完成, 开始模型预测...")
 
         # 计算原始数据的指标
-        grid_values = df_X[f"{element_db_column}_grid"].tolist()
-        original_metric = cal_metrics(df_y, grid_values)
+        # 观测值和格点值全程保持为numpy数组, 指标计算、残差还原和结果保存都直接使用
+        y_true = df_y.to_numpy(dtype=np.float64)
+        grid_values = df_X[f"{element_db_column}_grid"].to_numpy(dtype=np.float64, copy=False)
+        original_metric = cal_metrics(y_true, grid_values)
+        # 特征矩阵只转换一次为连续的float32数组, 所有模型复用(列顺序与训练时一致, 预测时跳过特征名校验)
+        X_arr = np.ascontiguousarray(df_X.to_numpy(dtype=np.float32))
         
         # 循环处理模型并实时更新进度
         total_models = len(model_paths)
         all_metrics = [{"station_name": station_name, "model_name": "原始数据(清洗后)", "metrics": original_metric}]
-        all_predictions = []
-        for i, model_path in enumerate(model_paths):
-            model_path = Path(model_path)
-            model_name = model_path.stem
-            # 更新进度
-            progress = 40 + (((i + 1) / total_models) * 60)
-            progress_text = f"正在处理第 {i + 1} 个模型: {model_name}"
-            crud.update_task_status(db, task_id, "PROCESSING", progress, progress_text)
-            print(f"正在处理第 {i + 1} 个模型: {model_name}")
-            # 加载模型
-            model = load_model(model_path)
-            # 预测
-            pred_raw = model.predict(df_X)
-            # 判断是否需要还原残差
-            if element in RESIDUAL_ELEMENTS:
-                pred_y = pred_raw + np.array(grid_values)
-            else:
-                pred_y = pred_raw
-            # 添加到结果列表
-            all_predictions.append({"station_name": station_name, "model_name": model_name, "pred_values": pred_y.tolist()})
-            all_metrics.append({"station_name": station_name, "model_name": model_name, "metrics": cal_metrics(df_y, pred_y)})
-            print(f"第 {i + 1} 个模型: {model_name} 预测完成")
+        # 所有模型的预测值按行存放在一个(模型数, 样本数)的连续矩阵中, 各模型直接写入自己的一行
+        # 预测值使用float32已足够(XGBoost本身即以float32输出), 内存和结果文件减半; 指标计算时与float64的观测值运算
+        pred_matrix = np.empty((total_models, len(y_true)), dtype=np.float32)
+        model_names = [None] * total_models
+        model_metrics = [None] * total_models
+        # 多个模型在线程池中并行加载和预测(模型读取和预测均在C/C++中释放GIL), 按完成顺序汇报进度
+        completed_models = 0
+        progress_updater = crud.ThrottledStatusUpdater(db, task_id, min_interval=PROGRESS_UPDATE_INTERVAL)
+        num_threads = max(1, min(total_models, MODEL_LOAD_THREADS, os.cpu_count() or 1))
+        with ThreadPoolExecutor(max_workers=num_threads) as model_pool:
+            model_futures = {
+                model_pool.submit(_predict_one, model_path, X_arr, grid_values, y_true, element, pred_matrix[i]): i
+                for i, model_path in enumerate(model_paths)
+            }
+            for future in as_completed(model_futures):
+                i = model_futures[future]
+                model_name, metrics = future.result()
+                # 按提交顺序放入结果列表, 保证输出顺序与model_paths一致
+                model_names[i] = model_name
+                model_metrics[i] = {"station_name": station_name, "model_name": model_name, "metrics": metrics}
+                # 更新进度
+                completed_models += 1
+                progress = 40 + ((completed_models / total_models) * 60)
+                progress_text = f"已完成 {completed_models}/{total_models} 个模型: {model_name}"
+                progress_updater.update("PROCESSING", progress, progress_text)
+                print(f"第 {i + 1} 个模型: {model_name} 预测完成")
+        all_metrics.extend(model_metrics)
+        # 保存格式不变(每个模型一条记录), pred_values为预测矩阵中对应行的视图, 不复制数据
+        all_predictions = [
+            {"station_name": station_name, "model_name": model_name, "pred_values": pred_matrix[i]}
+            for i, model_name in enumerate(model_names)
+        ]
         
         # 计算综合评分
         try:
@@ -133,11 +201,16 @@ def evaluate_model(task_id: str, element: str, station_name: str, start_time: da
             all_metrics_with_S = all_metrics    # 如果失败, 使用原指标
 
         # 组装并保存最终结果
-        timestamps = pd.to_datetime(df_base["timestamp"])  # 转换为datetime对象
+        # 各列保持为numpy数组, 由序列化函数直接编码, 避免逐元素转换为python对象
+        # 时间戳与特征构建后保留的行对齐; 数据库返回的字符串才需要解析, 已是datetime类型时直接使用
+        timestamp_col = df_base.loc[df_y.index, "timestamp"]
+        if not pd.api.types.is_datetime64_any_dtype(timestamp_col):
+            timestamp_col = pd.to_datetime(timestamp_col, format="ISO8601", cache=True)
+        timestamps = timestamp_col.to_numpy(dtype="datetime64[s]")
         final_results = {
-            "timestamps": [ts.isoformat() for ts in timestamps],
-            "station_values": df_y.tolist(),
-            "grid_values": df_X[f"{element_db_column}_grid"].tolist(),
+            "timestamps": timestamps,
+            "station_values": y_true,
+            "grid_values": grid_values,
             "pred_values": all_predictions,
             "metrics": all_metrics_with_S,
         }
@@ -145,8 +218,7 @@ def evaluate_model(task_id: str, element: str, station_name: str, start_time: da
         output_dir = Path(f"output/pivot_model_results/{element}")
         output_dir.mkdir(parents=True, exist_ok=True)
         output_path = output_dir / f"{element}_{station_name}.json"
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(final_results, f, ensure_ascii=False, indent=4)
+        _dump_results_json(final_results, output_path)
 
         # 更新任务状态
         task = crud.get_task_by_id(db, task_id)
@@ -183,25 +255,27 @@ def create_export_zip_task(task_id: str, element: str, start_time: datetime, end
         crud.update_task_status(db, task_id, "PROCESSING", 0, f"准备压缩 {total_files} 个文件...")
 
         # 3. 循环查找并压缩文件
-        # 使用 'w' 模式创建新的zip文件, ZIP_DEFLATED 提供较好的压缩率
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for i, ts in enumerate(timestamps):
-                try:
-                    # 查找对应的订正文件
-                    file_path = find_corrected_nc_file_for_timestamp(element, ts)
-                    
-                    # 写入zip包, arcname=file_path.name 确保zip包内是扁平结构, 不含服务器绝对路径
-                    zf.write(file_path, arcname=file_path.name)
-                    files_found += 1
-                except FileNotFoundError:
-                    # 如果某个时次的文件不存在, 打印警告并跳过
+        # 一次性列出时间范围内各年份目录下的订正文件, 代替逐时次检查文件是否存在
+        file_index = index_nc_files(element, range(start_time.year, end_time.year + 1), corrected=True)
+        # 使用 'w' 模式创建新的zip文件; 订正后的nc文件内部已经过zlib压缩, 直接存储(ZIP_STORED)不再重复压缩
+        progress_updater = crud.ThrottledStatusUpdater(db, task_id, min_interval=PROGRESS_UPDATE_INTERVAL)
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
+            # 时间戳一次性格式化为与文件名一致的字符串, 先找出存在的文件(不存在的时次打印警告并跳过)
+            file_paths, file_positions = [], []
+            for i, ts in enumerate(timestamps.strftime('%Y%m%d%H')):
+                file_path = file_index.get(ts)
+                if file_path is None:
                     print(f"警告: 未找到 {ts} 的订正文件, 已跳过")
-                    pass
-                
-                # 4. 周期性更新进度 (例如每50个文件或最后1个文件)
-                if (i + 1) % 10 == 0 or (i + 1) == total_files:
-                    progress = ((i + 1) / total_files) * 100
-                    crud.update_task_status(db, task_id, "PROCESSING", progress, f"正在压缩文件... ({i+1}/{total_files})")
+                    continue
+                file_paths.append(file_path)
+                file_positions.append(i)
+
+            # 按时间顺序写入zip包(扁平结构, 不含服务器绝对路径), 后续文件由线程池提前打开并预读, 隐藏文件打开和读取的延迟(无法读取的文件跳过, 不计入files_found)
+            for file_order, files_found in write_files_to_zip(zf, file_paths):
+                i = file_positions[file_order]
+                # 4. 周期性更新进度(按时间节流写入数据库)
+                progress = ((i + 1) / total_files) * 100
+                progress_updater.update("PROCESSING", progress, f"正在压缩文件... ({i+1}/{total_files})")
 
         # 5. 任务完成, 更新数据库
         final_message = f"打包完成, 共找到 {files_found} / {total_files} 个文件"
@@ -223,6 +297,277 @@ def create_export_zip_task(task_id: str, element: str, start_time: datetime, end
     finally:
         db.close()
 
+def _draw_province(ax, boundary_lines, city_labels: list, label_alpha: float):
+    """在子图上叠加湖北省行政区划边界和地名"""
+    if boundary_lines is None:
+        return
+    boundary_lines.plot(ax=ax, color='gray', linewidth=1)
+    for cx, cy, name in city_labels:
+        ax.text(cx, cy, name, fontsize=8, color='black', alpha=label_alpha, ha='center', va='center', zorder=10)
+
+@lru_cache(maxsize=None)
+def _build_cmap(element: str):
+    """
+    根据要素构建色标(各时次共用), 兼容所有要素, 统一cmap变量定义。
+
+    :return: (cmap, norm, boundaries, ticks), 连续色标时norm/boundaries/ticks为None.
+    """
+    bar_cfg = ELEMENT_BAR_MAPPING.get(element, 'RdBu_r')
+    if isinstance(bar_cfg, dict):
+        boundaries = bar_cfg['boundaries']
+        colors = bar_cfg['colors']
+        ticks = bar_cfg['ticks']
+        cmap = matplotlib.colors.ListedColormap(colors)
+        norm = matplotlib.colors.BoundaryNorm(boundaries, ncolors=len(colors), clip=True)
+        return cmap, norm, boundaries, ticks
+    return bar_cfg, None, None, None
+
+def _create_compare_figure(element: str, data_array_orig, data_array_corr, diff, vmin: float, vmax: float, diff_abs_max: float, boundary_lines, city_labels: list) -> dict:
+    """创建订正前/订正后/误差一行三列的对比图(含色标、坐标格式和行政区划叠加), 返回图和各子图的网格对象"""
+    # 创建一行三列的子图
+    fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(24, 8))
+
+    # 单位和色标标签
+    unit = ELEMENT_UNIT_MAPPING.get(element, '')
+    value_label = f"{element} ({unit})" if unit else element
+    diff_label = f"{element} (diff, {unit})" if unit else f"{element} (diff)"
+    cmap, norm, boundaries, ticks = _build_cmap(element)
+
+    # 绘制订正前 (现在是掩膜后的数据, NaN区域将透明)
+    if boundaries is not None and norm is not None:
+        im1 = data_array_orig.plot.pcolormesh(
+            ax=ax1,
+            cmap=cmap,
+            norm=norm,
+            vmin=min(boundaries),
+            vmax=max(boundaries),
+            cbar_kwargs={'label': value_label, 'orientation': 'horizontal', 'pad': 0.15, 'ticks': ticks}
+        )
+    else:
+        im1 = data_array_orig.plot.pcolormesh(
+            ax=ax1,
+            cmap=cmap,
+            vmin=vmin,
+            vmax=vmax,
+            cbar_kwargs={'label': value_label, 'orientation': 'horizontal', 'pad': 0.15}
+        )
+    ax1.xaxis.set_major_formatter(_FMT_LON)
+    ax1.yaxis.set_major_formatter(_FMT_LAT)
+    ax1.set_xlabel('Longitude') # 确保轴标签正确
+    ax1.set_ylabel('Latitude')  # 确保轴标签正确
+    # 叠加湖北省行政区划边界和地名 (边界线和地名位置已预先计算)
+    _draw_province(ax1, boundary_lines, city_labels, label_alpha=0.5)
+
+    # 绘制订正后 (现在是掩膜后的数据, NaN区域将透明)
+    if boundaries is not None and norm is not None:
+        im2 = data_array_corr.plot.pcolormesh(
+            ax=ax2,
+            cmap=cmap,
+            norm=norm,
+            vmin=min(boundaries),
+            vmax=max(boundaries),
+            cbar_kwargs={'label': value_label, 'orientation': 'horizontal', 'pad': 0.15, 'ticks': ticks}
+        )
+    else:
+        im2 = data_array_corr.plot.pcolormesh(
+            ax=ax2,
+            cmap=cmap,
+            vmin=vmin,
+            vmax=vmax,
+            cbar_kwargs={'label': value_label, 'orientation': 'horizontal', 'pad': 0.15}
+        )
+    ax2.xaxis.set_major_formatter(_FMT_LON)
+    ax2.yaxis.set_major_formatter(_FMT_LAT)
+    ax2.set_xlabel('Longitude') # 确保轴标签正确
+    ax2.set_ylabel('Latitude')  # 确保轴标签正确
+    _draw_province(ax2, boundary_lines, city_labels, label_alpha=0.5)
+
+    # 绘制误差 (订正后 - 订正前, NaN区域将透明)
+    im3 = diff.plot.pcolormesh( # 【修改】imshow -> pcolormesh
+        ax=ax3,
+        cmap="coolwarm",
+        vmin=-diff_abs_max,
+        vmax=diff_abs_max,
+        cbar_kwargs={'label': diff_label, 'orientation': 'horizontal', 'pad': 0.15}
+    )
+    ax3.xaxis.set_major_formatter(_FMT_LON)
+    ax3.yaxis.set_major_formatter(_FMT_LAT)
+    ax3.set_xlabel('Longitude') # 确保轴标签正确
+    ax3.set_ylabel('Latitude')  # 确保轴标签正确
+    _draw_province(ax3, boundary_lines, city_labels, label_alpha=0.7)
+
+    return {
+        "key": (element, data_array_orig.shape),
+        "fig": fig,
+        "axes": (ax1, ax2, ax3),
+        "meshes": (im1, im2, im3),
+    }
+
+def _render_compare_image(
+    ts: pd.Timestamp, nc_file_path: Path, correct_nc_file_path: Path, element: str, nc_var: str, temp_image_dir: Path,
+    province_geo_path: str, province_geo_mtime: float, verbose: bool = False
+) -> bool:
+    """绘制单个时次订正前/订正后/误差的对比图并保存为png[图像导出子进程任务], 返回是否成功生成"""
+    global _COMPARE_FIGURE
+    _, hubei_mask_geometry = load_province_geo(province_geo_path, province_geo_mtime)
+    boundary_lines, city_labels = load_province_artists(province_geo_path, province_geo_mtime)
+    try:
+        # 使用 xarray 和 matplotlib 绘图：一行三列（原始 / 订正 / 误差）
+        # 文件只读取一次且只用到第一个时次, 跳过CF时间解码和xarray的数据缓存(缩放/缺测值解码保留)
+        open_kwargs = dict(decode_times=False, cache=False)
+        with xr.open_dataset(nc_file_path, **open_kwargs) as ds_orig, xr.open_dataset(correct_nc_file_path, **open_kwargs) as ds_corr:
+            
+            # 步骤 1: 立即为整个数据集设置空间维度
+            try:
+                # 检查 .rio 访问器是否存在
+                if rioxarray is None or not hasattr(ds_orig, "rio"):
+                    raise AttributeError("'Dataset' object has no attribute 'rio'. rioxarray 导入或注册失败。")
+                
+                ds_orig_spatial = ds_orig.rio.set_spatial_dims(x_dim='lon', y_dim='lat').rio.write_crs("EPSG:4326")
+                ds_corr_spatial = ds_corr.rio.set_spatial_dims(x_dim='lon', y_dim='lat').rio.write_crs("EPSG:4326")
+            
+            except AttributeError as e:
+                print(f"致命错误: {e}")
+                print("请确保 'rioxarray' 已正确安装 (pip install rioxarray)。将使用未裁剪的数据。")
+                ds_orig_spatial = ds_orig
+                ds_corr_spatial = ds_corr
+                    
+            except Exception as rio_e:
+                print(f"警告: 设置空间维度失败: {rio_e}。将使用未裁剪的数据。")
+                ds_orig_spatial = ds_orig
+                ds_corr_spatial = ds_corr
+
+            # 步骤 2: 现在才选择变量和时间, 并一次性读入这一个二维切片
+            # 绘图只需float32精度(解码后的格点数据通常为float64), 后续掩膜、误差计算和栅格化处理的数据量减半
+            data_array_orig = ds_orig_spatial[nc_var].isel(time=0).load().astype(np.float32, copy=False)
+            data_array_corr = ds_corr_spatial[nc_var].isel(time=0).load().astype(np.float32, copy=False)
+            # 相对湿度最大值为100, 如果预测出大于100的值置为100(数据已读入内存, 直接在numpy数组上原地截断)
+            if element == "相对湿度":
+                np.minimum(data_array_orig.values, 100, out=data_array_orig.values)
+                np.minimum(data_array_corr.values, 100, out=data_array_corr.values)
+
+            # 步骤 3: 在裁剪前, 重命名维度为 'x' 和 'y'
+            # rioxarray.clip() 严格要求维度名为 'x' 和 'y'
+            try:
+                data_array_orig = data_array_orig.rename({'lon': 'x', 'lat': 'y'})
+                data_array_corr = data_array_corr.rename({'lon': 'x', 'lat': 'y'})
+            except Exception as rename_e:
+                print(f"警告: 重命名 'lon'/'lat' 失败: {rename_e}。裁剪可能会失败。")
+
+            # 步骤 4: 应用掩膜 (如果 hubei_mask_geometry 存在)
+            if hubei_mask_geometry is not None:
+                try:
+                    # 检查 DataArray 范围 (仅调试一次)
+                    if verbose:
+                        # 使用 'x' 和 'y'
+                        print(f"信息 (ts={ts}): 准备裁剪. DataArray 范围 (x): {float(data_array_orig['x'].min())} to {float(data_array_orig['x'].max())}")
+                        print(f"信息 (ts={ts}): 准备裁剪. DataArray 范围 (y): {float(data_array_orig['y'].min())} to {float(data_array_orig['y'].max())}")
+
+                    # 裁剪 (边界外为 NaN): 掩膜只在首次遇到该网格时栅格化一次, 之后直接按布尔数组置NaN
+                    hubei_mask = get_hubei_mask(hubei_mask_geometry, data_array_orig)
+                    data_array_orig = data_array_orig.copy(data=np.where(hubei_mask, data_array_orig.values, np.nan))
+                    data_array_corr = data_array_corr.copy(data=np.where(hubei_mask, data_array_corr.values, np.nan))
+                    
+                    # 检查裁剪结果 (仅调试一次)
+                    if verbose:
+                        nan_count_orig = np.count_nonzero(np.isnan(data_array_orig.values))
+                        if nan_count_orig == 0:
+                            print(f"警告: 裁剪 'orig' 未产生 NaN。请再次核对 GeoJSON 和 NC 经纬度范围。")
+                        else:
+                            print(f"信息: 成功裁剪 'orig', 产生 {nan_count_orig} 个 NaN。")
+
+                except AttributeError as e:
+                    # 如果 ds.rio 成功了，但 da.rio 失败了
+                    print(f"警告: 裁剪 DataArray 失败: {e}。是否是切片导致rio访问器丢失？")
+                except Exception as clip_e:
+                    print(f"警告: 裁剪步骤失败: {clip_e}")
+
+            # 计算最大最小值，用于统一色标范围
+            # 使用 np.nanmin/np.nanmax 忽略掩膜区域的NaN值
+            orig_values = data_array_orig.values
+            corr_values = data_array_corr.values
+            try:
+                # fmin/fmax合并两幅图的极值时同样忽略NaN
+                vmin = float(np.fmin(np.nanmin(orig_values), np.nanmin(corr_values)))
+                vmax = float(np.fmax(np.nanmax(orig_values), np.nanmax(corr_values)))
+                
+                # 处理 vmin 和 vmax 相等或无效的情况 (例如全为NaN)
+                if np.isnan(vmin) or np.isnan(vmax) or vmin == vmax:
+                    vmin = 0.0
+                    vmax = 1.0
+                    
+            except Exception:
+                # 回退逻辑 (例如数据全为0或NaN)
+                vmin = float(data_array_orig.min())
+                vmax = float(data_array_orig.max())
+                if vmin == vmax:
+                    vmin -= 0.5
+                    vmax += 0.5
+
+
+            # 计算误差并确定对称色标范围
+            # diff 会自动继承掩膜 (边界外为 NaN); 两幅图网格相同, 直接在numpy数组上相减, 跳过xarray的坐标对齐
+            diff_values = corr_values - orig_values
+            diff = data_array_corr.copy(data=diff_values)
+            try:
+                # 最大绝对误差 = max(最大值, -最小值), 避免np.abs再分配一个完整数组
+                diff_abs_max = float(max(np.nanmax(diff_values, initial=-np.inf), -np.nanmin(diff_values, initial=np.inf)))
+                # 全为NaN时结果为-inf, 同样回退
+                if not np.isfinite(diff_abs_max) or diff_abs_max == 0: # 避免 vmin=vmax=0
+                    diff_abs_max = 1.0 
+            except Exception:
+                diff_abs_max = float(np.nanmax(np.abs(diff)))
+                if np.isnan(diff_abs_max) or diff_abs_max == 0:
+                    diff_abs_max = 1.0
+
+            # 创建或复用一行三列的对比图: 同一进程内各时次的网格、色标和行政区划叠加都相同,
+            # 只需替换各子图网格的数据和色标范围, 避免每个时次都重新创建整张图
+            figure_key = (element, data_array_orig.shape)
+            is_new_figure = _COMPARE_FIGURE is None or _COMPARE_FIGURE["key"] != figure_key
+            if is_new_figure:
+                if _COMPARE_FIGURE is not None:
+                    plt.close(_COMPARE_FIGURE["fig"])
+                _COMPARE_FIGURE = _create_compare_figure(
+                    element, data_array_orig, data_array_corr, diff, vmin, vmax, diff_abs_max, boundary_lines, city_labels
+                )
+            else:
+                im1, im2, im3 = _COMPARE_FIGURE["meshes"]
+                # NaN(掩膜外)区域保持透明
+                im1.set_array(np.ma.masked_invalid(orig_values))
+                im2.set_array(np.ma.masked_invalid(corr_values))
+                im3.set_array(np.ma.masked_invalid(diff_values))
+                # 连续色标随当前时次的数据范围变化, 分级色标(norm)的范围固定
+                if _build_cmap(element)[1] is None:
+                    im1.set_clim(vmin, vmax)
+                    im2.set_clim(vmin, vmax)
+                im3.set_clim(-diff_abs_max, diff_abs_max)
+            fig = _COMPARE_FIGURE["fig"]
+            ax1, ax2, ax3 = _COMPARE_FIGURE["axes"]
+            ax1.set_title(f"订正前 {element}\n{ts.strftime('%Y-%m-%d %H:%M')}", fontsize=14)
+            ax2.set_title(f"订正后 {element}\n{ts.strftime('%Y-%m-%d %H:%M')}", fontsize=14)
+            ax3.set_title(f"误差 (订正后 - 订正前)\n{ts.strftime('%Y-%m-%d %H:%M')}", fontsize=14)
+            if is_new_figure:
+                fig.tight_layout()  # 自动调整子图布局(标题长度固定, 只需在创建时调整一次)
+                # 同时计算一次紧凑的保存范围(等价于bbox_inches='tight'), 之后保存时直接复用, 省去每张图额外的一次渲染
+                fig.canvas.draw()
+                _COMPARE_FIGURE["bbox"] = fig.get_tightbbox(fig.canvas.get_renderer()).padded(plt.rcParams['savefig.pad_inches'])
+
+            # 定义图像输出路径
+            img_filename = f"compare_{nc_var}_{ts.strftime('%Y%m%d%H')}.png"
+            img_path = temp_image_dir / img_filename
+            
+            # 保存图像(图像在进程内复用, 不再每次关闭)
+            # 图像最终以ZIP_STORED打包, png使用最低的zlib压缩级别(默认为6), 文件略大但写入快得多
+            fig.savefig(img_path, dpi=300, bbox_inches=_COMPARE_FIGURE["bbox"], pil_kwargs={"compress_level": 1})
+            
+        return True
+
+    except Exception as plot_e:
+        print(f"警告: 绘制 {ts} 时出错: {plot_e}, 已跳过")
+        plt.close('all') # 确保关闭所有可能打开的图像
+        _COMPARE_FIGURE = None
+        return False
+
 def create_export_images_task(
     task_id: str, 
     element: str, 
@@ -253,307 +598,54 @@ def create_export_images_task(
         
         crud.update_task_status(db, task_id, "PROCESSING", 0, f"准备生成 {total_files} 张图像...")
 
-        # 读取湖北省行政区划边界，并准备一个用于掩膜的合并后边界
-        province_gdf = None # 用于绘制市界
-        hubei_mask_geometry = None # 用于裁剪
-        province_geo_path = Path(settings.HUBEI_MAP_PATH)
-        
-        if province_geo_path.exists():
-            try:
-                province_gdf = gpd.read_file(province_geo_path)
-                
-                # 准备用于掩膜的省级边界
-                # 确保 CRS (WGS84)
-                if province_gdf.crs is None:
-                    province_gdf_crs = province_gdf.set_crs("EPSG:4326")
-                else:
-                    province_gdf_crs = province_gdf.to_crs("EPSG:4326")
-                
-                # 创建一个合并的省级边界 (保留 province_gdf 不变, 用于绘制市级边界)
-                hubei_boundary_dissolved = province_gdf_crs.dissolve()
-                hubei_mask_geometry = hubei_boundary_dissolved.geometry
-                
-                # 打印 GeoJSON 范围
-                print(f"信息: 成功加载 GeoJSON 掩膜. 边界范围 (lon/lat bounds): {hubei_mask_geometry.bounds}")
-                
-            except Exception as geo_e:
-                print(f"读取行政区划失败: {geo_e}")
-                province_gdf = None
-                hubei_mask_geometry = None
-        else:
-             print(f"警告: 找不到 GeoJSON 文件: {province_geo_path}")
+        # 行政区划边界由各绘图进程按路径和修改时间各自读取一次并缓存, 这里只传递路径, 不跨进程传递几何对象
+        province_geo_path = str(settings.HUBEI_MAP_PATH)
+        province_geo_mtime = os.path.getmtime(province_geo_path) if os.path.exists(province_geo_path) else None
         
-        # 3. 循环查找、绘图、保存
-        for i, ts in enumerate(timestamps):
-            try:
-                # 查找对应的订正文件
-                nc_file_path = find_nc_file_for_timestamp(element, ts)
-                correct_nc_file_path = find_corrected_nc_file_for_timestamp(element, ts)
-                
-                # 使用 xarray 和 matplotlib 绘图：一行三列（原始 / 订正 / 误差）
-                with xr.open_dataset(nc_file_path) as ds_orig, xr.open_dataset(correct_nc_file_path) as ds_corr:
-                    
-                    # 步骤 1: 立即为整个数据集设置空间维度
-                    try:
-                        # 检查 .rio 访问器是否存在
-                        if rioxarray is None or not hasattr(ds_orig, "rio"):
-                            raise AttributeError("'Dataset' object has no attribute 'rio'. rioxarray 导入或注册失败。")
-                        
-                        ds_orig_spatial = ds_orig.rio.set_spatial_dims(x_dim='lon', y_dim='lat').rio.write_crs("EPSG:4326")
-                        ds_corr_spatial = ds_corr.rio.set_spatial_dims(x_dim='lon', y_dim='lat').rio.write_crs("EPSG:4326")
-                    
-                    except AttributeError as e:
-                        print(f"致命错误: {e}")
-                        print("请确保 'rioxarray' 已正确安装 (pip install rioxarray)。将使用未裁剪的数据。")
-                        ds_orig_spatial = ds_orig
-                        ds_corr_spatial = ds_corr
-                            
-                    except Exception as rio_e:
-                        print(f"警告: 设置空间维度失败: {rio_e}。将使用未裁剪的数据。")
-                        ds_orig_spatial = ds_orig
-                        ds_corr_spatial = ds_corr
-
-                    # 步骤 2: 现在才选择变量和时间
-                    data_array_orig = ds_orig_spatial[nc_var].isel(time=0)
-                    data_array_corr = ds_corr_spatial[nc_var].isel(time=0)
-                    # 相对湿度最大值为100, 如果预测出大于100的值置为100
-                    if element == "相对湿度":
-                        data_array_orig = data_array_orig.clip(max=100)
-                        data_array_corr = data_array_corr.clip(max=100)
-
-                    # 步骤 3: 在裁剪前, 重命名维度为 'x' 和 'y'
-                    # rioxarray.clip() 严格要求维度名为 'x' 和 'y'
-                    try:
-                        data_array_orig = data_array_orig.rename({'lon': 'x', 'lat': 'y'})
-                        data_array_corr = data_array_corr.rename({'lon': 'x', 'lat': 'y'})
-                    except Exception as rename_e:
-                        print(f"警告: 重命名 'lon'/'lat' 失败: {rename_e}。裁剪可能会失败。")
-
-                    # 步骤 4: 应用掩膜 (如果 hubei_mask_geometry 存在)
-                    if hubei_mask_geometry is not None:
-                        try:
-                            # 检查 DataArray 范围 (仅调试一次)
-                            if i == 0: 
-                                # 使用 'x' 和 'y'
-                                print(f"信息 (ts={ts}): 准备裁剪. DataArray 范围 (x): {float(data_array_orig['x'].min())} to {float(data_array_orig['x'].max())}")
-                                print(f"信息 (ts={ts}): 准备裁剪. DataArray 范围 (y): {float(data_array_orig['y'].min())} to {float(data_array_orig['y'].max())}")
-
-                            # 裁剪 (边界外为 NaN)
-                            data_array_orig = data_array_orig.rio.clip(hubei_mask_geometry, all_touched=True, drop=False)
-                            data_array_corr = data_array_corr.rio.clip(hubei_mask_geometry, all_touched=True, drop=False)
-                            
-                            # 检查裁剪结果 (仅调试一次)
-                            if i == 0:
-                                nan_count_orig = np.count_nonzero(np.isnan(data_array_orig.values))
-                                if nan_count_orig == 0:
-                                    print(f"警告: 裁剪 'orig' 未产生 NaN。请再次核对 GeoJSON 和 NC 经纬度范围。")
-                                else:
-                                    print(f"信息: 成功裁剪 'orig', 产生 {nan_count_orig} 个 NaN。")
-
-                        except AttributeError as e:
-                            # 如果 ds.rio 成功了，但 da.rio 失败了
-                            print(f"警告: 裁剪 DataArray 失败: {e}。是否是切片导致rio访问器丢失？")
-                        except Exception as clip_e:
-                            print(f"警告: 裁剪步骤失败: {clip_e}")
-
-                    # 计算最大最小值，用于统一色标范围
-                    # 使用 np.nanmin/np.nanmax 忽略掩膜区域的NaN值
-                    try:
-                        orig_min = float(np.nanmin(data_array_orig.values))
-                        corr_min = float(np.nanmin(data_array_corr.values))
-                        orig_max = float(np.nanmax(data_array_orig.values))
-                        corr_max = float(np.nanmax(data_array_corr.values))
-                        
-                        vmin = min(orig_min, corr_min)
-                        vmax = max(orig_max, corr_max)
-                        
-                        # 处理 vmin 和 vmax 相等或无效的情况 (例如全为NaN)
-                        if np.isnan(vmin) or np.isnan(vmax) or vmin == vmax:
-                            vmin = 0.0
-                            vmax = 1.0
-                            
-                    except Exception:
-                        # 回退逻辑 (例如数据全为0或NaN)
-                        vmin = float(data_array_orig.min())
-                        vmax = float(data_array_orig.max())
-                        if vmin == vmax:
-                            vmin -= 0.5
-                            vmax += 0.5
-
-
-                    # 计算误差并确定对称色标范围
-                    # diff 会自动继承掩膜 (边界外为 NaN)
-                    diff = data_array_corr - data_array_orig
-                    try:
-                        diff_abs_max = float(np.nanmax(np.abs(diff.values)))
-                        if np.isnan(diff_abs_max) or diff_abs_max == 0: # 避免 vmin=vmax=0
-                            diff_abs_max = 1.0 
-                    except Exception:
-                        diff_abs_max = float(np.nanmax(np.abs(diff)))
-                        if np.isnan(diff_abs_max) or diff_abs_max == 0:
-                            diff_abs_max = 1.0
-
-                    # 创建一行三列的子图
-                    fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(24, 8))
-
-                    # 单位和色标标签
-                    unit = ELEMENT_UNIT_MAPPING.get(element, '')
-                    value_label = f"{element} ({unit})" if unit else element
-                    diff_label = f"{element} (diff, {unit})" if unit else f"{element} (diff)"
-                    bar_cfg = ELEMENT_BAR_MAPPING.get(element, 'RdBu_r')
-                    # 兼容所有要素，统一cmap变量定义
-                    if isinstance(bar_cfg, dict):
-                        boundaries = bar_cfg['boundaries']
-                        colors = bar_cfg['colors']
-                        ticks = bar_cfg['ticks']
-                        cmap = matplotlib.colors.ListedColormap(colors)
-                        norm = matplotlib.colors.BoundaryNorm(boundaries, ncolors=len(colors), clip=True)
-                    else:
-                        cmap = bar_cfg
-                        boundaries = None
-                        norm = None
-                        ticks = None
-
-                    # 经纬度刻度格式化器
-                    def _deg_fmt_lon(x, pos):
-                        try:
-                            s = f"{x:.2f}"
-                            if '.' in s:
-                                s = s.rstrip('0').rstrip('.')
-                        except Exception:
-                            s = str(x)
-                        return s + '°E'
-
-                    def _deg_fmt_lat(x, pos):
-                        try:
-                            s = f"{x:.2f}"
-                            if '.' in s:
-                                s = s.rstrip('0').rstrip('.')
-                        except Exception:
-                            s = str(x)
-                        return s + '°N'
-
-                    lon_formatter = FuncFormatter(_deg_fmt_lon)
-                    lat_formatter = FuncFormatter(_deg_fmt_lat)
-
-                    # 绘制订正前 (现在是掩膜后的数据, NaN区域将透明)
-                    if boundaries is not None and norm is not None:
-                        im1 = data_array_orig.plot.pcolormesh(
-                            ax=ax1,
-                            cmap=cmap,
-                            norm=norm,
-                            vmin=min(boundaries),
-                            vmax=max(boundaries),
-                            cbar_kwargs={'label': value_label, 'orientation': 'horizontal', 'pad': 0.15, 'ticks': ticks}
-                        )
-                    else:
-                        im1 = data_array_orig.plot.pcolormesh(
-                            ax=ax1,
-                            cmap=cmap,
-                            vmin=vmin,
-                            vmax=vmax,
-                            cbar_kwargs={'label': value_label, 'orientation': 'horizontal', 'pad': 0.15}
-                        )
-                    ax1.set_title(f"订正前 {element}\n{ts.strftime('%Y-%m-%d %H:%M')}", fontsize=14)
-                    ax1.xaxis.set_major_formatter(lon_formatter)
-                    ax1.yaxis.set_major_formatter(lat_formatter)
-                    ax1.set_xlabel('Longitude') # 确保轴标签正确
-                    ax1.set_ylabel('Latitude')  # 确保轴标签正确
-                    # 叠加湖北省行政区划边界和地名 (使用原始的 province_gdf)
-                    if province_gdf is not None:
-                        province_gdf.boundary.plot(ax=ax1, color='gray', linewidth=1)
-                        for idx, row in province_gdf.iterrows():
-                            if row.geometry is not None and hasattr(row.geometry, 'centroid'):
-                                centroid = row.geometry.centroid
-                                name = row.get('name', row.get('NAME', None))
-                                if name:
-                                    ax1.text(centroid.x, centroid.y, name, fontsize=8, color='black', alpha=0.5, ha='center', va='center', zorder=10)
-
-                    # 绘制订正后 (现在是掩膜后的数据, NaN区域将透明)
-                    if boundaries is not None and norm is not None:
-                        im2 = data_array_corr.plot.pcolormesh(
-                            ax=ax2,
-                            cmap=cmap,
-                            norm=norm,
-                            vmin=min(boundaries),
-                            vmax=max(boundaries),
-                            cbar_kwargs={'label': value_label, 'orientation': 'horizontal', 'pad': 0.15, 'ticks': ticks}
-                        )
-                    else:
-                        im2 = data_array_corr.plot.pcolormesh(
-                            ax=ax2,
-                            cmap=cmap,
-                            vmin=vmin,
-                            vmax=vmax,
-                            cbar_kwargs={'label': value_label, 'orientation': 'horizontal', 'pad': 0.15}
-                        )
-                    ax2.set_title(f"订正后 {element}\n{ts.strftime('%Y-%m-%d %H:%M')}", fontsize=14)
-                    ax2.xaxis.set_major_formatter(lon_formatter)
-                    ax2.yaxis.set_major_formatter(lat_formatter)
-                    ax2.set_xlabel('Longitude') # 确保轴标签正确
-                    ax2.set_ylabel('Latitude')  # 确保轴标签正确
-                    if province_gdf is not None:
-                        province_gdf.boundary.plot(ax=ax2, color='gray', linewidth=1)
-                        for idx, row in province_gdf.iterrows():
-                            if row.geometry is not None and hasattr(row.geometry, 'centroid'):
-                                centroid = row.geometry.centroid
-                                name = row.get('name', row.get('NAME', None))
-                                if name:
-                                    ax2.text(centroid.x, centroid.y, name, fontsize=8, color='black', alpha=0.5, ha='center', va='center', zorder=10)
-
-                    # 绘制误差 (订正后 - 订正前, NaN区域将透明)
-                    im3 = diff.plot.pcolormesh( # 【修改】imshow -> pcolormesh
-                        ax=ax3,
-                        cmap="coolwarm",
-                        vmin=-diff_abs_max,
-                        vmax=diff_abs_max,
-                        cbar_kwargs={'label': diff_label, 'orientation': 'horizontal', 'pad': 0.15}
-                    )
-                    ax3.set_title(f"误差 (订正后 - 订正前)\n{ts.strftime('%Y-%m-%d %H:%M')}", fontsize=14)
-                    ax3.xaxis.set_major_formatter(lon_formatter)
-                    ax3.yaxis.set_major_formatter(lat_formatter)
-                    ax3.set_xlabel('Longitude') # 确保轴标签正确
-                    ax3.set_ylabel('Latitude')  # 确保轴标签正确
-                    if province_gdf is not None:
-                        province_gdf.boundary.plot(ax=ax3, color='gray', linewidth=1)
-                        for idx, row in province_gdf.iterrows():
-                            if row.geometry is not None and hasattr(row.geometry, 'centroid'):
-                                centroid = row.geometry.centroid
-                                name = row.get('name', row.get('NAME', None))
-                                if name:
-                                    ax3.text( centroid.x, centroid.y, name, fontsize=8, color='black', alpha=0.7, ha='center', va='center', zorder=10)
-
-                    plt.tight_layout()  # 自动调整子图布局
-
-                    # 定义图像输出路径
-                    img_filename = f"compare_{nc_var}_{ts.strftime('%Y%m%d%H')}.png"
-                    img_path = temp_image_dir / img_filename
-                    
-                    # 保存图像
-                    fig.savefig(img_path, dpi=300, bbox_inches='tight')
-                    
-                    # 关闭图像以释放内存
-                    plt.close(fig)
-                    
+        # 3. 一次性列出原始和订正后的格点文件, 只为两者都存在的时次绘图
+        years = range(start_time.year, end_time.year + 1)
+        orig_file_index = index_nc_files(element, years, corrected=False)
+        corr_file_index = index_nc_files(element, years, corrected=True)
+        # 时间戳一次性格式化为与文件名一致的字符串, 只为需要绘图的时次创建Timestamp对象
+        render_indices, orig_files, corr_files = [], [], []
+        for i, ts in enumerate(timestamps.strftime('%Y%m%d%H')):
+            nc_file_path, correct_nc_file_path = orig_file_index.get(ts), corr_file_index.get(ts)
+            if nc_file_path is None or correct_nc_file_path is None:
+                print(f"警告: 未找到 {ts} 的原始或订正文件, 已跳过")
+                continue
+            render_indices.append(i)
+            orig_files.append(nc_file_path)
+            corr_files.append(correct_nc_file_path)
+        render_timestamps = timestamps[render_indices]
+        total_renders = len(render_timestamps)
+
+        # 4. 多进程绘图、保存: 各时次读取的文件和输出的图像互不相关, 在导出任务共用的进程池中逐个时次绘制
+        # (同时运行的多个导出任务共享同一组绘图进程, 不再各自创建进程池)
+        progress_updater = crud.ThrottledStatusUpdater(db, task_id, min_interval=PROGRESS_UPDATE_INTERVAL)
+        results = map_in_export_pool(
+            _render_compare_image, render_timestamps, orig_files, corr_files, repeat(element), repeat(nc_var),
+            repeat(temp_image_dir), repeat(province_geo_path), repeat(province_geo_mtime),
+            [i == 0 for i in range(total_renders)]
+        )
+        for i, success in enumerate(results):
+            if success:
                 files_found += 1
-                
-            except Exception as plot_e:
-                print(f"警告: 绘制 {ts} 时出错: {plot_e}, 已跳过")
-                plt.close('all') # 确保关闭所有可能打开的图像
-                pass
             
-            # 4. 周期性更新进度
-            if (i + 1) % 50 == 0 or (i + 1) == total_files:
-                progress = ((i + 1) / total_files) * 90 # 压缩占10%
-                # 确保进度不超过95
-                progress = min(progress, 95)
-                crud.update_task_status(db, task_id, "PROCESSING", progress, f"正在生成图像... ({i+1}/{total_files})")
+            # 周期性更新进度(按时间节流写入数据库)
+            progress = ((i + 1) / total_renders) * 90 # 压缩占10%
+            # 确保进度不超过95
+            progress = min(progress, 95)
+            progress_updater.update("PROCESSING", progress, f"正在生成图像... ({i+1}/{total_renders})")
 
         # 5. 压缩所有生成的图像
         crud.update_task_status(db, task_id, "PROCESSING", 95, f"图像生成完毕 ({files_found}张), 开始压缩...")
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for img_file in temp_image_dir.glob("*.png"):
-                zf.write(img_file, arcname=img_file.name)
+        # png本身已是压缩格式, 直接存储(ZIP_STORED)不再重复压缩
+        # 用os.scandir列出图像(目录项自带文件名和类型, 不再为每个文件构造Path并做通配符匹配), 按文件名即时间顺序写入
+        with os.scandir(temp_image_dir) as entries:
+            img_files = sorted(entry.path for entry in entries if entry.name.endswith(".png") and entry.is_file())
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for img_file in img_files:
+                write_file_to_zip(zf, img_file)
         
         # 6. 任务完成, 更新数据库
         final_message = f"图像打包完成, 共生成 {files_found} / {total_files} 张图像"
@@ -590,36 +682,20 @@ def evaluate_models_by_metrics(task_id: str, element: str, season: str, test_set
         # 任务初始化
         crud.update_task_status(db, task_id, "PROCESSING", 0.0, "任务初始化, 准备筛选模型...")
 
-        # 获取所有模型记录
-        all_records = crud.get_all_model_records(db)
-        if not all_records:
-            crud.update_task_status(db, task_id, "FAILED", 0.0, "数据库中没有任何模型记录")
-            raise ValueError("数据库中没有任何模型记录")
+        # 在数据库中按要素和季节筛选模型记录(指定季节 -> 匹配该季节 + 全年模型; 指定全年 -> 只匹配全年模型)
+        candidate_records = crud.get_model_records_by_element_season(db, element, season)
+        if not candidate_records:
+            crud.update_task_status(db, task_id, "FAILED", 0.0, f"数据库中没有符合要素和季节的模型记录: element={element}, season={season}")
+            return
 
-        crud.update_task_status(db, task_id, "PROCESSING", 20.0, f"找到 {len(all_records)} 个模型记录, 开始筛选...")
+        crud.update_task_status(db, task_id, "PROCESSING", 20.0, f"找到 {len(candidate_records)} 个模型记录, 开始筛选...")
 
-        # 筛选符合条件的模型记录
+        # 筛选测试集值匹配的模型记录
         filtered_records = []
-        for record in all_records:
-            # 检查要素是否匹配
-            if record.element != element:
-                continue
-
-            # 检查训练参数中的季节和测试集值
+        for record in candidate_records:
             train_params = record.get_train_params()
-            record_season = train_params.get("season", "")
             record_test_set_values = train_params.get("test_set_values", [])
 
-            # 季节匹配检查: 指定季节 -> 匹配该季节 + 全年模型
-            if season != "全年":
-                # 指定具体季节时, 匹配该季节和全年模型
-                if record_season not in [season, "全年"]:
-                    continue
-            else:
-                # 指定全年时, 只匹配全年模型
-                if record_season != "全年":
-                    continue
-
             # 测试集值匹配检查 (需要完全匹配)
             if set(record_test_set_values) != set(test_set_values):
                 continue
@@ -628,97 +704,80 @@ def evaluate_models_by_metrics(task_id: str, element: str, season: str, test_set
 
         if not filtered_records:
             crud.update_task_status(db, task_id, "FAILED", 0.0, f"没有找到符合条件的模型记录: element={element}, season={season}, test_set_values={test_set_values}")
-            raise ValueError(f"没有找到符合条件的模型记录: element={element}, season={season}, test_set_values={test_set_values}")
+            return
 
         crud.update_task_status(db, task_id, "PROCESSING", 40.0, f"筛选出 {len(filtered_records)} 个符合条件的模型, 开始读取指标...")
 
         # 读取每个模型的整体指标
+        # 一次性列出该要素的所有整体指标文件, 按训练任务ID索引(文件名以训练任务ID结尾), 代替逐个模型拼接路径并检查是否存在
+        metrics_index = {
+            path.stem.rsplit("_", 1)[-1]: path
+            for path in Path(settings.METRIC_OUTPUT_DIR).glob(f"*/overall/*_{element}_*.json")
+        }
         all_metrics = []
-        for i, record in enumerate(filtered_records):
-            progress = 40 + (((i + 1) / len(filtered_records)) * 40)
-            progress_text = f"正在读取第 {i + 1} 个模型的指标: {record.model_name}"
-            crud.update_task_status(db, task_id, "PROCESSING", progress, progress_text)
-
-            # 构建指标文件路径
-            train_params = record.get_train_params()
-            model_name = train_params.get("model", "").lower()
-            start_year = train_params.get("start_year", "")
-            end_year = train_params.get("end_year", "")
-            season = train_params.get("season", "")
-            split_method = train_params.get("split_method", "")
-
-            # 根据模型记录信息构建指标文件路径
-            metrics_file_name = f"{model_name}_{element}_{start_year}_{end_year}_{season}_{split_method}_{record.task_id}.json"
-            metrics_dir = Path(settings.METRIC_OUTPUT_DIR) / model_name / "overall"
-            metrics_path = metrics_dir / metrics_file_name
-
-            if not metrics_path.exists():
-                print(f"警告: 找不到指标文件 {metrics_path}, 跳过该模型")
-                continue
-
-            # 读取指标文件
-            try:
-                with open(metrics_path, 'r', encoding='utf-8') as f:
-                    metrics_data = json.load(f)
-
-                # 使用测试集预测指标 (testset_pred)
-                metrics = metrics_data.get("testset_pred", {})
+        # 第一个成功读取的指标文件内容, 用于后面添加原始数据指标(testset_true), 避免再次读取
+        first_metrics_data, first_record_season = None, ""
+        progress_updater = crud.ThrottledStatusUpdater(db, task_id, min_interval=PROGRESS_UPDATE_INTERVAL)
+        # 指标文件在线程池中并行读取, 当前线程按模型顺序依次汇总结果和更新进度
+        metrics_paths = [metrics_index.get(record.task_id) for record in filtered_records]
+        with ThreadPoolExecutor(max_workers=METRICS_READ_THREADS) as read_pool:
+            read_futures = [
+                read_pool.submit(load_json, metrics_path) if metrics_path is not None else None
+                for metrics_path in metrics_paths
+            ]
+            for i, (record, read_future) in enumerate(zip(filtered_records, read_futures)):
+                progress = 40 + (((i + 1) / len(filtered_records)) * 40)
+                progress_text = f"正在读取第 {i + 1} 个模型的指标: {record.model_name}"
+                progress_updater.update("PROCESSING", progress, progress_text)
+
+                record_season = record.get_train_params().get("season", "")
+                if read_future is None:
+                    print(f"警告: 找不到模型 {record.model_name} 的指标文件(训练任务ID: {record.task_id}), 跳过该模型")
+                    continue
 
-                # 添加到结果列表
-                all_metrics.append({
-                    "model_name": record.model_name,
-                    "model_id": record.model_id,
-                    "task_id": record.task_id,
-                    "season": record_season,
-                    "metrics": metrics
-                })
+                # 获取读取的指标文件内容
+                try:
+                    metrics_data = read_future.result()
+                    if first_metrics_data is None:
+                        first_metrics_data, first_record_season = metrics_data, record_season
+
+                    # 使用测试集预测指标 (testset_pred)
+                    metrics = metrics_data.get("testset_pred", {})
+
+                    # 添加到结果列表
+                    all_metrics.append({
+                        "model_name": record.model_name,
+                        "model_id": record.model_id,
+                        "task_id": record.task_id,
+                        "season": record_season,
+                        "metrics": metrics
+                    })
 
-                print(f"成功读取模型 {record.model_name} 的指标")
+                    print(f"成功读取模型 {record.model_name} 的指标")
 
-            except Exception as e:
-                print(f"读取模型 {record.model_name} 的指标文件失败: {e}")
-                continue
+                except Exception as e:
+                    print(f"读取模型 {record.model_name} 的指标文件失败: {e}")
+                    continue
 
         if not all_metrics:
             crud.update_task_status(db, task_id, "FAILED", 0.0, "所有模型的指标文件读取失败")
-            raise ValueError("所有模型的指标文件读取失败")
+            return
 
-        # 添加原始指标 (从第一个模型的testset_true获取)
-        if all_metrics:
-            try:
-                # 获取第一个模型的指标文件路径
-                first_record = filtered_records[0]
-                train_params = first_record.get_train_params()
-                model_name = train_params.get("model", "").lower()
-                start_year = train_params.get("start_year", "")
-                end_year = train_params.get("end_year", "")
-                record_season = train_params.get("season", "")
-                record_split_method = train_params.get("split_method", "")
-
-                metrics_file_name = f"{model_name}_{element}_{start_year}_{end_year}_{record_season}_{record_split_method}_{first_record.task_id}.json"
-                metrics_dir = Path(settings.METRIC_OUTPUT_DIR) / model_name / "overall"
-                metrics_path = metrics_dir / metrics_file_name
-
-                if metrics_path.exists():
-                    with open(metrics_path, 'r', encoding='utf-8') as f:
-                        metrics_data = json.load(f)
-
-                    # 使用测试集真实指标 (testset_true)
-                    original_metrics = metrics_data.get("testset_true", {})
-
-                    # 添加原始指标到结果列表
-                    all_metrics.insert(0, {
-                        "model_name": "原始数据",
-                        "model_id": "original_data",
-                        "task_id": "original",
-                        "season":  record_season,
-                        "metrics": original_metrics
-                    })
+        # 添加原始指标 (从第一个模型已读取的指标中获取testset_true)
+        if first_metrics_data is not None:
+            # 使用测试集真实指标 (testset_true)
+            original_metrics = first_metrics_data.get("testset_true", {})
 
-                    print("成功添加原始数据指标")
+            # 添加原始指标到结果列表
+            all_metrics.insert(0, {
+                "model_name": "原始数据",
+                "model_id": "original_data",
+                "task_id": "original",
+                "season":  first_record_season,
+                "metrics": original_metrics
+            })
 
-            except Exception as e:
-                print(f"读取原始数据指标失败: {e}")
+            print("成功添加原始数据指标")
 
         crud.update_task_status(db, task_id, "PROCESSING", 85.0, f"成功读取 {len(all_metrics)} 个模型的指标, 开始计算综合评分...")
 
@@ -741,18 +800,21 @@ def evaluate_models_by_metrics(task_id: str, element: str, season: str, test_set
             "ranked_models": all_metrics_with_S
         }
 
-        # 保存结果到本地
-        output_dir = Path(f"output/pivot_model_ranking/{element}")
-        output_dir.mkdir(parents=True, exist_ok=True)
-        output_path = output_dir / f"{element}_{season}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(final_results, f, ensure_ascii=False, indent=4)
-
         # 更新任务状态
         task = crud.get_task_by_id(db, task_id)
         if task:
             params = task.get_params()
-            params["result_path"] = str(output_path)
+            # 排序结果通常很小, 压缩后直接存入任务参数, api从数据库读取, 省去一次文件写入和读取; 过大时仍保存到本地
+            payload = _results_to_json_bytes(final_results)
+            if len(payload) < RESULT_BLOB_MAX_BYTES:
+                params["result_blob"] = encode_result_blob(payload)
+            else:
+                output_dir = Path(f"output/pivot_model_ranking/{element}")
+                output_dir.mkdir(parents=True, exist_ok=True)
+                output_path = output_dir / f"{element}_{season}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+                with open(output_path, "wb") as f:
+                    f.write(payload)
+                params["result_path"] = str(output_path)
             task.set_params(params)
             db.add(task)
             crud.update_task_status(db, task_id, "COMPLETED", 100.0, f"分析完成, 共对 {len(all_metrics_with_S)} 个模型进行排序")
@@ -1,24 +1,31 @@
 # src/tasks/data_preview.py
+import os
 import zipfile
 import shutil
 import matplotlib
+import numpy as np
 import pandas as pd
 import xarray as xr
-import geopandas as gpd
 import matplotlib.pyplot as plt
 from pathlib import Path
 from datetime import datetime
-from matplotlib.ticker import FuncFormatter
+from itertools import repeat
+from functools import lru_cache
 from ..db import crud
 from ..db.database import SessionLocal
 from ..core.config import settings
 from ..core.data_mapping import ELEMENT_TO_NC_MAPPING
-from ..utils.file_io import find_nc_file_for_timestamp
+from ..utils.file_io import index_nc_files, write_file_to_zip, write_files_to_zip
+from ..utils.export_pool import map_in_export_pool
+from ..utils.plot_format import _FMT_LON, _FMT_LAT
+from ..utils.province_geo import load_province_geo, load_province_artists, get_hubei_mask
 
 matplotlib.use('Agg')  # 使用 'Agg' 后端, 适用于非GUI环境的后台任务
 plt.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
 plt.rcParams['axes.unicode_minus'] = False  # 用来正常显示负号
 
+# 绘图进程内复用的单面板图(图、子图和网格对象), 由_render_preview_image在首次绘图时创建
+_PREVIEW_FIGURE = None
 
 # 要素到单位的映射，用于在色标上显示单位
 ELEMENT_UNIT_MAPPING = {
@@ -85,25 +92,27 @@ def create_export_zip_task(task_id: str, element: str, start_time: datetime, end
         crud.update_task_status(db, task_id, "PROCESSING", 0, f"准备压缩 {total_files} 个文件...")
 
         # 3. 循环查找并压缩文件
-        # 使用 'w' 模式创建新的zip文件, ZIP_DEFLATED 提供较好的压缩率
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for i, ts in enumerate(timestamps):
-                try:
-                    # 查找对应的订正文件
-                    file_path = find_nc_file_for_timestamp(element, ts)
-                    
-                    # 写入zip包, arcname=file_path.name 确保zip包内是扁平结构, 不含服务器绝对路径
-                    zf.write(file_path, arcname=file_path.name)
-                    files_found += 1
-                except FileNotFoundError:
-                    # 如果某个时次的文件不存在, 打印警告并跳过
-                    print(f"警告: 未找到 {ts} 的订正文件, 已跳过")
-                    pass
-                
-                # 4. 周期性更新进度 (例如每50个文件或最后1个文件)
-                if (i + 1) % 50 == 0 or (i + 1) == total_files:
-                    progress = ((i + 1) / total_files) * 100
-                    crud.update_task_status(db, task_id, "PROCESSING", progress, f"正在压缩文件... ({i+1}/{total_files})")
+        # 一次性列出时间范围内各年份目录下的格点文件, 代替逐时次检查文件是否存在
+        file_index = index_nc_files(element, range(start_time.year, end_time.year + 1))
+        # 使用 'w' 模式创建新的zip文件; nc文件(NetCDF4/HDF5)内部已经过压缩, 直接存储(ZIP_STORED)不再重复压缩
+        progress_updater = crud.ThrottledStatusUpdater(db, task_id, min_interval=2.0, min_step=1.0)
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
+            # 时间戳一次性格式化为与文件名一致的字符串, 先找出存在的文件(不存在的时次打印警告并跳过)
+            file_paths, file_positions = [], []
+            for i, ts in enumerate(timestamps.strftime('%Y%m%d%H')):
+                file_path = file_index.get(ts)
+                if file_path is None:
+                    print(f"警告: 未找到 {ts} 的格点文件, 已跳过")
+                    continue
+                file_paths.append(file_path)
+                file_positions.append(i)
+
+            # 按时间顺序写入zip包(扁平结构, 不含服务器绝对路径), 后续文件由线程池提前打开并预读, 隐藏文件打开和读取的延迟(无法读取的文件跳过, 不计入files_found)
+            for file_order, files_found in write_files_to_zip(zf, file_paths):
+                i = file_positions[file_order]
+                # 4. 周期性更新进度 (进度前进1%或距上次写入超过2秒时才写入数据库)
+                progress = ((i + 1) / total_files) * 100
+                progress_updater.update("PROCESSING", progress, f"正在压缩文件... ({i+1}/{total_files})")
 
         # 5. 任务完成, 更新数据库
         final_message = f"打包完成, 共找到 {files_found} / {total_files} 个文件"
@@ -125,6 +134,197 @@ def create_export_zip_task(task_id: str, element: str, start_time: datetime, end
     finally:
         db.close()
 
+def _preview_clim(values: np.ndarray):
+    """连续色标的数据范围, 与xarray自动确定的范围一致(数据跨越0时取对称范围), 全为NaN时回退为(0, 1)"""
+    vmin = float(np.nanmin(values, initial=np.inf))
+    vmax = float(np.nanmax(values, initial=-np.inf))
+    if not (np.isfinite(vmin) and np.isfinite(vmax)):
+        return 0.0, 1.0
+    if vmin < 0 < vmax:
+        vlim = max(abs(vmin), abs(vmax))
+        return -vlim, vlim
+    return vmin, vmax
+
+@lru_cache(maxsize=None)
+def _build_cmap(element: str):
+    """
+    根据要素构建色标(每个进程每个要素只构建一次), 默认回退到 'coolwarm'。
+
+    :return: (cmap, norm, boundaries, ticks), 连续色标时norm/boundaries/ticks为None.
+    """
+    bar_cfg = ELEMENT_BAR_MAPPING.get(element, 'coolwarm')
+    if isinstance(bar_cfg, dict):
+        boundaries = bar_cfg['boundaries']
+        colors = bar_cfg['colors']
+        ticks = bar_cfg['ticks']
+        cmap = matplotlib.colors.ListedColormap(colors)
+        norm = matplotlib.colors.BoundaryNorm(boundaries, ncolors=len(colors), clip=True)
+        return cmap, norm, boundaries, ticks
+    return bar_cfg, None, None, None
+
+def _is_regular_grid(data_array) -> bool:
+    """判断二维数据的经纬度坐标是否等间距(等间距网格可以按图像绘制, 与pcolormesh的显示效果一致)"""
+    for dim in data_array.dims:
+        coord = np.asarray(data_array[dim].values, dtype=float)
+        if coord.ndim != 1 or coord.size < 2:
+            return False
+        step = np.diff(coord)
+        if not np.allclose(step, step[0], rtol=1e-3, atol=0):
+            return False
+    return True
+
+def _create_preview_figure(element: str, data_array, boundary_lines, city_labels: list) -> dict:
+    """创建单面板的格点数据图(含色标、坐标格式和行政区划叠加), 返回图、子图和网格对象"""
+    fig, ax = plt.subplots(figsize=(10, 8)) # 单面板
+    
+    # --- 设置色标和单位 ---
+    unit = ELEMENT_UNIT_MAPPING.get(element, '')
+    value_label = f"{element} ({unit})" if unit else element
+    cmap, norm, boundaries, ticks = _build_cmap(element)
+    # ---------------------------------
+
+    # --- 绘制网格并应用样式 ---
+    # 等间距经纬度网格按图像(imshow, 最近邻)绘制: 显示范围和像元边界与pcolormesh相同,
+    # 但Agg按整幅图像重采样, 不再逐个四边形栅格化, 每个时次保存时的绘制开销小得多; 非等间距网格仍用pcolormesh
+    plot_func = data_array.plot.imshow if _is_regular_grid(data_array) else data_array.plot.pcolormesh
+    if boundaries is not None and norm is not None:
+        im = plot_func(
+            ax=ax,
+            cmap=cmap,
+            norm=norm,
+            vmin=min(boundaries),
+            vmax=max(boundaries),
+            cbar_kwargs={'label': value_label, 'orientation': 'horizontal', 'pad': 0.1}
+        )
+        # 为分段色标设置刻度
+        if ticks:
+            im.colorbar.set_ticks(ticks)
+    else:
+        # 自动范围 (例如温度), 复用图像时按同样的规则更新范围
+        vmin, vmax = _preview_clim(data_array.values)
+        im = plot_func(
+            ax=ax,
+            cmap=cmap,
+            vmin=vmin,
+            vmax=vmax,
+            cbar_kwargs={'label': value_label, 'orientation': 'horizontal', 'pad': 0.1}
+        )
+    
+    # 应用格式化器
+    ax.xaxis.set_major_formatter(_FMT_LON)
+    ax.yaxis.set_major_formatter(_FMT_LAT)
+    ax.set_xlabel('Longitude')
+    ax.set_ylabel('Latitude')
+
+    # 叠加湖北省行政区划边界和地名(边界线和地名位置已预先计算)
+    if boundary_lines is not None:
+        boundary_lines.plot(ax=ax, color='gray', linewidth=1, zorder=10)
+        for cx, cy, name in city_labels:
+            ax.text(
+                cx,
+                cy,
+                name,
+                fontsize=8,       # 字体大小
+                color='black',    # 字体颜色
+                alpha=0.6,      # 透明度
+                ha='center',    # 水平居中
+                va='center',    # 垂直居中
+                zorder=11       # 确保在边界线之上
+            )
+
+    return {
+        "key": (element, data_array.shape),
+        "fig": fig,
+        "ax": ax,
+        "mesh": im,
+        "continuous": norm is None,
+    }
+
+def _render_preview_image(
+    ts: pd.Timestamp, nc_file_path: Path, element: str, nc_var: str, temp_image_dir: Path,
+    province_geo_path: str, province_geo_mtime: float
+) -> bool:
+    """绘制单个时次的格点数据并保存为png[图像导出子进程任务], 返回是否成功生成"""
+    global _PREVIEW_FIGURE
+    _, hubei_mask_geometry = load_province_geo(province_geo_path, province_geo_mtime)
+    boundary_lines, city_labels = load_province_artists(province_geo_path, province_geo_mtime)
+    try:
+        # 使用 xarray 和 matplotlib 绘图
+        # 文件只读取一次且只用到第一个时次, 跳过CF时间解码和xarray的数据缓存(缩放/缺测值解码保留)
+        # 只取出需要的变量和时次, 空间维度和CRS也只设置在这一个二维切片上, 不处理整个数据集
+        with xr.open_dataset(nc_file_path, decode_times=False, cache=False) as ds:
+            
+            # --- 应用 rioxarray 裁剪 ---
+            data_array = ds[nc_var].isel(time=0)
+            try:
+                data_array = data_array.rio.set_spatial_dims(x_dim='lon', y_dim='lat').rio.write_crs("EPSG:4326")
+            except Exception as rio_e:
+                print(f"警告: 设置空间维度失败: {rio_e}。将使用未裁剪的数据。")
+
+            # 重命名 'lon'/'lat' 为 'x'/'y' 以便裁剪
+            try:
+                data_array = data_array.rename({'lon': 'x', 'lat': 'y'})
+            except Exception as rename_e:
+                # 忽略错误, 可能已经重命名或维度名称不同
+                pass 
+
+            # 一次性读入这一个二维切片, 后续裁剪、建图和更新数据都直接使用
+            # 绘图只需float32精度(解码后的格点数据通常为float64), 后续掩膜、色标映射和栅格化处理的数据量减半
+            data_array = data_array.load().astype(np.float32, copy=False)
+
+            # 相对湿度最大值为100 (读入后原地截断, 不再额外复制数组)
+            if element == "相对湿度":
+                np.minimum(data_array.values, 100, out=data_array.values)
+
+            # 应用裁剪 (边界外为 NaN): 掩膜只在首次遇到该网格时栅格化一次, 之后直接按布尔数组置NaN,
+            # 不再对每个时次重复做逐像元的多边形判断
+            if hubei_mask_geometry is not None:
+                try:
+                    hubei_mask = get_hubei_mask(hubei_mask_geometry, data_array)
+                    data_array = data_array.copy(data=np.where(hubei_mask, data_array.values, np.nan))
+                except Exception as clip_e:
+                    print(f"警告: 裁剪步骤失败: {clip_e}")
+            # --------------------------------------
+            values = data_array.values
+
+            # 创建或复用单面板图: 同一进程内各时次的网格、色标和行政区划叠加都相同,
+            # 只需替换网格的数据和色标范围, 避免每个时次都重新创建整张图
+            figure_key = (element, values.shape)
+            is_new_figure = _PREVIEW_FIGURE is None or _PREVIEW_FIGURE["key"] != figure_key
+            if is_new_figure:
+                if _PREVIEW_FIGURE is not None:
+                    plt.close(_PREVIEW_FIGURE["fig"])
+                _PREVIEW_FIGURE = _create_preview_figure(element, data_array, boundary_lines, city_labels)
+            else:
+                im = _PREVIEW_FIGURE["mesh"]
+                # NaN(裁剪外)区域保持透明
+                im.set_array(np.ma.masked_invalid(values))
+                # 连续色标随当前时次的数据范围变化, 分级色标(norm)的范围固定
+                if _PREVIEW_FIGURE["continuous"]:
+                    im.set_clim(*_preview_clim(values))
+            fig, ax = _PREVIEW_FIGURE["fig"], _PREVIEW_FIGURE["ax"]
+            ax.set_title(f"订正前 {element}\n{ts.strftime('%Y-%m-%d %H:%M')}", fontsize=16)
+            if is_new_figure:
+                fig.tight_layout()  # 自动调整子图布局(标题长度固定, 只需在创建时调整一次)
+                # 同时计算一次紧凑的保存范围(等价于bbox_inches='tight'), 之后保存时直接复用
+                fig.canvas.draw()
+                _PREVIEW_FIGURE["bbox"] = fig.get_tightbbox(fig.canvas.get_renderer()).padded(plt.rcParams['savefig.pad_inches'])
+            
+            # 定义图像输出路径
+            img_filename = f"{nc_var}_{ts.strftime('%Y%m%d%H')}.png"
+            img_path = temp_image_dir / img_filename
+            
+            # 保存图像 (提高DPI, png使用最低的zlib压缩级别以加快写入; 图像在进程内复用, 不再每次关闭)
+            fig.savefig(img_path, dpi=150, bbox_inches=_PREVIEW_FIGURE["bbox"], pil_kwargs={"compress_level": 1})
+
+        return True
+
+    except Exception as plot_e:
+        print(f"警告: 绘制 {ts} 时出错: {plot_e}, 已跳过")
+        plt.close('all') # 确保关闭所有可能打开的图像
+        _PREVIEW_FIGURE = None
+        return False
+
 def create_export_images_task(task_id: str, element: str, start_time: datetime, end_time: datetime):
     """
     查找格点.nc文件, 绘制成.png图像 (采用 data_pivot 样式), 并压缩为.zip包。
@@ -150,197 +350,49 @@ def create_export_images_task(task_id: str, element: str, start_time: datetime,
         
         crud.update_task_status(db, task_id, "PROCESSING", 0, f"准备生成 {total_files} 张图像...")
 
-        # --- 加载行政区划文件用于裁剪和叠加 ---
-        province_gdf = None # 用于绘制市界
-        hubei_mask_geometry = None # 用于裁剪
-        # 假设 settings.HUBEI_MAP_PATH 在 config.py 中定义
-        province_geo_path = Path(settings.HUBEI_MAP_PATH) 
-        
-        if province_geo_path.exists():
-            try:
-                province_gdf = gpd.read_file(province_geo_path)
-                # 确保 CRS (WGS84)
-                if province_gdf.crs is None:
-                    province_gdf_crs = province_gdf.set_crs("EPSG:4326")
-                else:
-                    province_gdf_crs = province_gdf.to_crs("EPSG:4326")
-                
-                # 创建一个合并的省级边界 (保留 province_gdf 不变, 用于绘制市级边界)
-                hubei_boundary_dissolved = province_gdf_crs.dissolve()
-                hubei_mask_geometry = hubei_boundary_dissolved.geometry
-                print(f"信息: 成功加载 GeoJSON 掩膜. 边界范围: {hubei_mask_geometry.bounds}")
-            except Exception as geo_e:
-                print(f"读取行政区划失败: {geo_e}")
-                province_gdf = None
-                hubei_mask_geometry = None
-        else:
-             print(f"警告: 找不到 GeoJSON 文件: {province_geo_path}")
-
-        # 3. 循环查找、绘图、保存
-        for i, ts in enumerate(timestamps):
-            try:
-                # 查找对应的订正文件
-                nc_file_path = find_nc_file_for_timestamp(element, ts)
-                
-                # 使用 xarray 和 matplotlib 绘图
-                with xr.open_dataset(nc_file_path) as ds:
-                    
-                    # --- 应用 rioxarray 裁剪 ---
-                    try:
-                        ds_spatial = ds.rio.set_spatial_dims(x_dim='lon', y_dim='lat').rio.write_crs("EPSG:4326")
-                    except Exception as rio_e:
-                        print(f"警告: 设置空间维度失败: {rio_e}。将使用未裁剪的数据。")
-                        ds_spatial = ds
-                    
-                    data_array = ds_spatial[nc_var].isel(time=0)
-
-                    # 相对湿度最大值为100
-                    if element == "相对湿度":
-                        data_array = data_array.clip(max=100)
-
-                    # 重命名 'lon'/'lat' 为 'x'/'y' 以便裁剪
-                    try:
-                        data_array = data_array.rename({'lon': 'x', 'lat': 'y'})
-                    except Exception as rename_e:
-                        # 忽略错误, 可能已经重命名或维度名称不同
-                        pass 
-
-                    # 应用裁剪 (边界外为 NaN)
-                    if hubei_mask_geometry is not None:
-                        try:
-                            data_array = data_array.rio.clip(hubei_mask_geometry, all_touched=True, drop=False)
-                        except Exception as clip_e:
-                            print(f"警告: 裁剪步骤失败: {clip_e}")
-                    # --------------------------------------
-
-                    fig, ax = plt.subplots(figsize=(10, 8)) # 单面板
-                    
-                    # --- 设置色标和单位 ---
-                    unit = ELEMENT_UNIT_MAPPING.get(element, '')
-                    value_label = f"{element} ({unit})" if unit else element
-                    # 默认回退到 'coolwarm'
-                    bar_cfg = ELEMENT_BAR_MAPPING.get(element, 'coolwarm') 
-                    
-                    if isinstance(bar_cfg, dict):
-                        boundaries = bar_cfg['boundaries']
-                        colors = bar_cfg['colors']
-                        ticks = bar_cfg['ticks']
-                        cmap = matplotlib.colors.ListedColormap(colors)
-                        norm = matplotlib.colors.BoundaryNorm(boundaries, ncolors=len(colors), clip=True)
-                    else:
-                        cmap = bar_cfg
-                        boundaries = None
-                        norm = None
-                        ticks = None
-                    # ---------------------------------
-
-                    # --- 经纬度刻度格式化器 ---
-                    def _deg_fmt_lon(x, pos):
-                        try:
-                            s = f"{x:.2f}"
-                            if '.' in s: s = s.rstrip('0').rstrip('.')
-                        except Exception: s = str(x)
-                        return s + '°E'
-
-                    def _deg_fmt_lat(x, pos):
-                        try:
-                            s = f"{x:.2f}"
-                            if '.' in s: s = s.rstrip('0').rstrip('.')
-                        except Exception: s = str(x)
-                        return s + '°N'
-
-                    lon_formatter = FuncFormatter(_deg_fmt_lon)
-                    lat_formatter = FuncFormatter(_deg_fmt_lat)
-                    # ---------------------------------
-
-                    # --- 绘制 pcolormesh 并应用样式 ---
-                    if boundaries is not None and norm is not None:
-                        im = data_array.plot.pcolormesh(
-                            ax=ax,
-                            cmap=cmap,
-                            norm=norm,
-                            vmin=min(boundaries),
-                            vmax=max(boundaries),
-                            cbar_kwargs={'label': value_label, 'orientation': 'horizontal', 'pad': 0.1}
-                        )
-                        # 为分段色标设置刻度
-                        if ticks:
-                            im.colorbar.set_ticks(ticks)
-                    else:
-                        # 自动范围 (例如温度)
-                        im = data_array.plot.pcolormesh(
-                            ax=ax,
-                            cmap=cmap,
-                            cbar_kwargs={'label': value_label, 'orientation': 'horizontal', 'pad': 0.1}
-                        )
-                    
-                    ax.set_title(f"订正前 {element}\n{ts.strftime('%Y-%m-%d %H:%M')}", fontsize=16)
-                    
-                    # 应用格式化器
-                    ax.xaxis.set_major_formatter(lon_formatter)
-                    ax.yaxis.set_major_formatter(lat_formatter)
-                    ax.set_xlabel('Longitude')
-                    ax.set_ylabel('Latitude')
-
-                    # 叠加湖北省行政区划边界
-                    if province_gdf is not None:
-                        province_gdf.boundary.plot(ax=ax, color='gray', linewidth=1, zorder=10)
-
-                        # 叠加湖北省行政区划边界
-                    if province_gdf is not None:
-                        province_gdf.boundary.plot(ax=ax, color='gray', linewidth=1, zorder=10)
-                        
-                        # --- 循环遍历 GeoDataFrame 以添加区域名称 ---
-                        for idx, row in province_gdf.iterrows():
-                            if row.geometry is not None and hasattr(row.geometry, 'centroid'):
-                                centroid = row.geometry.centroid
-                                # 尝试获取 "name" 字段, 如果没有则尝试 "NAME"
-                                name = row.get('name', row.get('NAME', None))
-                                if name:
-                                    ax.text(
-                                        centroid.x, 
-                                        centroid.y, 
-                                        name, 
-                                        fontsize=8,       # 字体大小
-                                        color='black',    # 字体颜色
-                                        alpha=0.6,      # 透明度
-                                        ha='center',    # 水平居中
-                                        va='center',    # 垂直居中
-                                        zorder=11       # 确保在边界线之上
-                                    )
-                    plt.tight_layout()
-                    
-                    # 定义图像输出路径
-                    img_filename = f"{nc_var}_{ts.strftime('%Y%m%d%H')}.png"
-                    img_path = temp_image_dir / img_filename
-                    
-                    # 保存图像 (提高DPI)
-                    fig.savefig(img_path, dpi=150, bbox_inches='tight')
-                    
-                    # 关闭图像以释放内存
-                    plt.close(fig)
-                    
+        # --- 行政区划文件用于裁剪和叠加, 由各绘图进程按路径和修改时间各自读取一次并缓存 ---
+        province_geo_path = str(settings.HUBEI_MAP_PATH)
+        province_geo_mtime = os.path.getmtime(province_geo_path) if os.path.exists(province_geo_path) else None
+
+        # 3. 一次性列出各年份目录下的格点文件, 只为存在的时次绘图
+        file_index = index_nc_files(element, range(start_time.year, end_time.year + 1))
+        # 时间戳一次性格式化为与文件名一致的字符串, 只为需要绘图的时次创建Timestamp对象
+        render_indices, nc_files = [], []
+        for i, ts in enumerate(timestamps.strftime('%Y%m%d%H')):
+            nc_file_path = file_index.get(ts)
+            if nc_file_path is None:
+                print(f"警告: 未找到 {ts} 的格点文件, 已跳过")
+                continue
+            render_indices.append(i)
+            nc_files.append(nc_file_path)
+        render_timestamps = timestamps[render_indices]
+        total_renders = len(render_timestamps)
+
+        # 4. 多进程绘图、保存: 各时次读取的文件和输出的图像互不相关, 在导出任务共用的进程池中逐个时次绘制
+        # (同时运行的多个导出任务共享同一组绘图进程, 不再各自创建进程池)
+        progress_updater = crud.ThrottledStatusUpdater(db, task_id, min_interval=2.0, min_step=1.0)
+        results = map_in_export_pool(
+            _render_preview_image, render_timestamps, nc_files, repeat(element), repeat(nc_var),
+            repeat(temp_image_dir), repeat(province_geo_path), repeat(province_geo_mtime)
+        )
+        for i, success in enumerate(results):
+            if success:
                 files_found += 1
-                
-            except FileNotFoundError:
-                print(f"警告: 未找到 {ts} 的订正文件, 已跳过")
-                pass
-            except Exception as plot_e:
-                print(f"警告: 绘制 {ts} 时出错: {plot_e}, 已跳过")
-                plt.close('all') # 确保关闭所有可能打开的图像
-                pass
             
-            # 4. 周期性更新进度
-            if (i + 1) % 50 == 0 or (i + 1) == total_files:
-                progress = ((i + 1) / total_files) * 90 # 压缩占10%
-                progress = min(progress, 95) # 确保不超过95
-                crud.update_task_status(db, task_id, "PROCESSING", progress, f"正在生成图像... ({i+1}/{total_files})")
+            # 周期性更新进度 (进度前进1%或距上次写入超过2秒时才写入数据库)
+            progress = ((i + 1) / total_renders) * 90 # 压缩占10%
+            progress = min(progress, 95) # 确保不超过95
+            progress_updater.update("PROCESSING", progress, f"正在生成图像... ({i+1}/{total_renders})")
 
         # 5. 压缩所有生成的图像
         crud.update_task_status(db, task_id, "PROCESSING", 95, f"图像生成完毕 ({files_found}张), 开始压缩...")
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for img_file in temp_image_dir.glob("*.png"):
-                zf.write(img_file, arcname=img_file.name)
+        # png本身已是压缩格式, 直接存储(ZIP_STORED)不再重复压缩
+        # 用os.scandir列出图像(目录项自带文件名和类型, 不再为每个文件构造Path并做通配符匹配), 按文件名即时间顺序写入
+        with os.scandir(temp_image_dir) as entries:
+            img_files = sorted(entry.path for entry in entries if entry.name.endswith(".png") and entry.is_file())
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for img_file in img_files:
+                write_file_to_zip(zf, img_file)
 
         # 6. 任务完成, 更新数据库
         final_message = f"图像打包完成, 共生成 {files_found} / {total_files} 张图像"
@@ -13,19 +13,21 @@ from sqlalchemy.orm import Session
 from ..db.database import SessionLocal
 from ..db.db_models import TaskProgress
 from ..db.crud import (
-    get_raw_station_data_by_year, create_task, update_task_status, 
-    check_existed_element_by_year, get_subtasks_by_parent_id, cancel_subtask
+    get_raw_station_data_by_year, create_task, bulk_create_tasks, update_task_status, 
+    get_existed_elements_years, count_finished_subtasks, cancel_subtask, ThrottledStatusUpdater
 )
 from ..core.config import settings, STOP_EVENT
 from ..core.data_mapping import ELEMENT_TO_DB_MAPPING, ELEMENT_TO_NC_MAPPING
 from ..core.data_process import (
-    clean_station_data, extract_grid_values_for_stations,
-    merge_sg_df, import_proc_data_from_temp_files, add_noise_to_grid_data
+    clean_station_data, extract_grid_values_for_stations, get_station_grid_indices,
+    merge_sg_df, import_proc_data_from_temp_files, add_noise_to_grid_data, shrink_calendar_dtypes
 )
 from ..utils.file_io import get_grid_files_for_month, safe_open_mfdataset
 
 
 TEMP_DATA_DIR = Path("output/temp_data")
+# 临时Parquet文件的写入参数: zstd压缩(低压缩级别, 写入开销与默认的snappy相近, 文件更小), 字典编码站号/站名等重复值
+PARQUET_WRITER_OPTIONS = {"compression": "zstd", "compression_level": 1, "use_dictionary": True, "write_statistics": True}
 
 def process_elements(db: Session, elements: List[str], start_year: str, end_year: str):
     """处理所有要素的数据"""
@@ -46,25 +48,19 @@ def process_yearly_element(subtask_id: str, element: str, year: str):
     os.makedirs(output_dir, exist_ok=True)
     output_file = os.path.join(output_dir, f"{element}_{year}.parquet")
 
+    # 中间进度节流写入(至少间隔2秒), 完成/失败等结束状态仍直接写入
+    status_updater = ThrottledStatusUpdater(db, subtask_id, min_interval=2.0, min_step=10.0)
+
     try:
         # 更新子任务状态为 处理中"PROCESSING"
-        update_task_status(db, subtask_id, "PROCESSING", 0.0, f"正在处理 {year} 年的 {element} 数据...")
+        status_updater.update("PROCESSING", 0.0, f"正在处理 {year} 年的 {element} 数据...")
         print(f"|---> [Worker PID:{mp.current_process().pid}] 正在处理 {year} 年的 {element} 数据...")
         
-        # 重复处理检查
-        print(f"|---> 正在检查 {year} 年的 {element} 数据是否已存在于数据库中...")
-        update_task_status(db, subtask_id, "PROCESSING", 1.0, f"正在检查 {year} 年的 {element} 数据是否已存在于数据库中...")
-        is_processed = check_existed_element_by_year(db, element, int(year))
-        if is_processed:
-            print(f"|---> 警告: {year} 年的 {element} 数据已存在于数据库中, 跳过处理")
-            update_task_status(db, subtask_id, "COMPLETED", 100.0, f"{year} 年的 {element} 数据已存在, 跳过处理")
-            return
-        else:
-            print(f"|---> {year} 年的 {element} 数据未处理, 准备处理...")
+        # 重复处理检查已由任务分发器(process_mp)在创建子任务前统一完成, 这里只处理尚未入库的要素和年份
 
         # 1. 从数据库读取指定element, year的所有站点数据表df(分块读取)
         try:
-            update_task_status(db, subtask_id, "PROCESSING", 5.0, f"正在读取 {year} 年的 {element} 站点数据...")
+            status_updater.update("PROCESSING", 5.0, f"正在读取 {year} 年的 {element} 站点数据...")
             db_column_name = ELEMENT_TO_DB_MAPPING.get(element)
             df_itrator = get_raw_station_data_by_year(db, db_column_name, int(year), chunk_size=8760)
         except Exception as e:
@@ -73,45 +69,62 @@ def process_yearly_element(subtask_id: str, element: str, year: str):
             return
         
         # 2. 数据清洗, 分块清洗
-        cleaned_chunks = [] # 搜集清洗后的数据块
+        # 清洗后的数据块直接按月份拆分保存, 后续逐月合并时才拼接当月的数据, 不再拼接出全年的大表(峰值内存减半)
+        month_parts = {month: [] for month in range(1, 13)}
         total_raws = 0
-        update_task_status(db, subtask_id, "PROCESSING", 10.0, f"正在分块清洗 {year} 年的 {element} 站点数据...")
+        total_cleaned = 0
+        status_updater.update("PROCESSING", 10.0, f"正在分块清洗 {year} 年的 {element} 站点数据...")
         print(f"|---> 开始分块清洗 {year} 年的 {element} 站点数据...")
         start_time = time()
         for df_chunk in df_itrator:
             total_raws += len(df_chunk)
             df_cleaned_chunk = clean_station_data(df_chunk, element) 
-            cleaned_chunks.append(df_cleaned_chunk)
+            # 将"station_value"列重命名为DB中的列名
+            df_cleaned_chunk.rename(columns={"station_value": db_column_name}, inplace=True)
+            shrink_calendar_dtypes(df_cleaned_chunk)
+            total_cleaned += len(df_cleaned_chunk)
+            for month, df_month_part in df_cleaned_chunk.groupby("month", sort=False):
+                month_parts[int(month)].append(df_month_part)
+            del df_cleaned_chunk
 
-        if not cleaned_chunks:
+        if total_raws == 0:
             print(f"|---> 警告: 在 {year} 年未找到有效的 {element} 站点数据")
             update_task_status(db, subtask_id, "FAILED", 10.0, f"在 {year} 年未找到有效的 {element} 站点数据")
             print(f"|-- [Worker PID:{mp.current_process().pid}] 警告: 在 {year} 年未找到有效的 {element} 站点数据")
             return
 
-        df_cleaned = pd.concat(cleaned_chunks, ignore_index=True)
-        # 将"station_value"列重命名为DB中的列名
-        df_cleaned.rename(columns={"station_value": db_column_name}, inplace=True)
-        del cleaned_chunks
-        update_task_status(db, subtask_id, "PROCESSING", 20.0, f"已清洗完成 {year} 年的 {element} 站点数据, 共 {total_raws} 条原始记录, 清洗后剩余 {len(df_cleaned)} 条有效记录")
-        print(f"耗时: {time() - start_time:.2f} 秒, 共处理 {total_raws} 条原始记录, 清洗后剩余 {len(df_cleaned)} 条有效记录")
+        status_updater.update("PROCESSING", 20.0, f"已清洗完成 {year} 年的 {element} 站点数据, 共 {total_raws} 条原始记录, 清洗后剩余 {total_cleaned} 条有效记录")
+        print(f"耗时: {time() - start_time:.2f} 秒, 共处理 {total_raws} 条原始记录, 清洗后剩余 {total_cleaned} 条有效记录")
 
         # 3. 读取所有站点的经纬度表
-        update_task_status(db, subtask_id, "PROCESSING", 25.0, f"正在读取所有站点的经纬度坐标...")
+        status_updater.update("PROCESSING", 25.0, f"正在读取所有站点的经纬度坐标...")
         station_info = pd.read_csv(settings.STATION_INFO_PATH, encoding="gbk")
-        station_coords = {}
-        for _, row in station_info.iterrows():
-            station_coords[row["区站号(数字)"]] = {"station_name": row["站名"], "lat": row["纬度"], "lon": row["经度"]}
+        # 整表一次性转换为{站号: {"station_name", "lat", "lon"}}, 站号重复时与逐行赋值一样保留最后一行
+        station_coords = (
+            station_info.drop_duplicates(subset="区站号(数字)", keep="last")
+            .rename(columns={"站名": "station_name", "纬度": "lat", "经度": "lon"})
+            .set_index("区站号(数字)")[["station_name", "lat", "lon"]]
+            .to_dict(orient="index")
+        )
 
         # 4. 根据82个站点的经纬度坐标, 按月份一次性提取格点值
         start_time = time()
         nc_var = ELEMENT_TO_NC_MAPPING.get(element)
         parquet_writer = None
         total_records_processed = 0
+        station_indices = None # 各站点最近格点的索引, 在第一个月计算后各月复用
 
         for month in range(1, 13):
             progress_month_start = 28.0 + (month -  1) * 6
-            update_task_status(db, subtask_id, "PROCESSING", progress_month_start, f"正在提取 {year} 年 {month:02d} 月格点数据...")
+            # 取出当月站点数据(取出后即从缓存中移除); 当月没有站点数据时不必再读取格点文件
+            df_month_parts = month_parts.pop(month)
+            if not df_month_parts:
+                print(f"|--->警告: ({element}, {year}-{month:02d}) 未找到有效的站点数据, 跳过")
+                continue
+            df_cleaned_month = pd.concat(df_month_parts, ignore_index=True)
+            del df_month_parts
+
+            status_updater.update("PROCESSING", progress_month_start, f"正在提取 {year} 年 {month:02d} 月格点数据...")
             grid_files_month = get_grid_files_for_month(settings.GRID_DATA_DIR, nc_var, year, month)
             if not grid_files_month:
                 print(f"|---> 警告: {year} 年 {month:02d} 月未找到 {element} 格点数据文件, 跳过")
@@ -131,7 +144,9 @@ def process_yearly_element(subtask_id: str, element: str, year: str):
 
             # 按月提取格点值
             try:
-                grid_df_month = extract_grid_values_for_stations(ds, nc_var, station_coords, year)
+                if station_indices is None:
+                    station_indices = get_station_grid_indices(ds, station_coords)
+                grid_df_month = extract_grid_values_for_stations(ds, nc_var, station_coords, year, station_indices)
                 seed_str = f"{element}_{year}_{month}"
                 deterministic_seed = int(hashlib.md5(seed_str.encode('utf-8')).hexdigest(), 16) % (2**32)
                 grid_df_month = add_noise_to_grid_data(grid_df_month, element, seed=deterministic_seed)
@@ -143,12 +158,6 @@ def process_yearly_element(subtask_id: str, element: str, year: str):
                     parquet_writer.close()
                 return
 
-            # 筛选当月站点数据
-            df_cleaned_month = df_cleaned[df_cleaned["month"] == month].copy()
-            if df_cleaned.month.empty:
-                print(f"|--->警告: ({element}, {year}-{month:02d}) 未找到有效的站点数据, 跳过")
-                continue
-
             # 按月合并站点数据和格点数据
             try:
                 df_sg_month = merge_sg_df(df_cleaned_month, grid_df_month, element)
@@ -164,9 +173,9 @@ def process_yearly_element(subtask_id: str, element: str, year: str):
                     table = pa.Table.from_pandas(df_sg_month, preserve_index=False)
                     if parquet_writer is None:
                         # 如果是第一个月, 使用它的schema创建写入器
-                        parquet_writer = pq.ParquetWriter(output_file, table.schema)
+                        parquet_writer = pq.ParquetWriter(output_file, table.schema, **PARQUET_WRITER_OPTIONS)
                     # 写入当月的数据块
-                    parquet_writer.write_table(table)
+                    parquet_writer.write_table(table, row_group_size=table.num_rows) # 每月一个行组
                     total_records_processed += len(df_sg_month)
                     print(f"|--->({element}, {year}-{month:02d}) 成功写入 {len(df_sg_month)} 条记录到临时文件")
                     # 释放已写入的数据内存
@@ -189,9 +198,6 @@ def process_yearly_element(subtask_id: str, element: str, year: str):
             update_task_status(db, subtask_id, "COMPLETED", 100.0, f"{year} 年 {element} 未找到有效数据, 已跳过")
             return
 
-        # 释放内存
-        del df_cleaned
-        
         update_task_status(db, subtask_id, "COMPLETED", 100.0, f"{year} 年的 {element} 数据处理完成, 共得到 {total_records_processed} 条记录, 已保存到临时文件: {output_file}")
         print(f"|-- [Worker PID:{mp.current_process().pid}] {year} 年 {element} 数据处理完成, 共得到 {total_records_processed} 条记录, 耗时: {time() - start_time:.2f} 秒")
 
@@ -212,17 +218,20 @@ def process_mp(task_id: str, elements: List[str], start_year: str, end_year: str
         # 1. 创建子任务
         update_task_status(db, task_id, "PROCESSING", 2.0, "正在创建子任务...")
         years = range(int(start_year), int(end_year) + 1)
+        # 重复处理检查: 一次查询所有(要素, 年份)是否已存在于数据库中, 已存在的不再创建子任务和启动工作进程
+        existed = get_existed_elements_years(db, elements, years)
+        sub_task_specs = []
         for element in elements:
             for year in years:
+                if (element, year) in existed:
+                    print(f"|--> 主进程: {year} 年的 {element} 数据已存在于数据库中, 跳过处理")
+                    continue
                 sub_task_id = str(uuid.uuid4())
                 sub_task_name = f"{year}年 {element} 数据处理"
                 params = {"element": element, "year": year}
-                create_task(
-                    db, task_id=sub_task_id, task_name=sub_task_name,
-                    task_type="DataProcess_SubTask", params=params,
-                    parent_task_id=task_id 
-                )
+                sub_task_specs.append((sub_task_id, sub_task_name, "DataProcess_SubTask", params))
                 sub_tasks_info.append({"sub_task_id": sub_task_id, "element": element, "year": str(year)})
+        bulk_create_tasks(db, sub_task_specs, parent_task_id=task_id)
         # 创建数据导入子任务
         import_subtask_id = str(uuid.uuid4())
         import_subtask_name = "导入处理后的数据"
@@ -232,8 +241,8 @@ def process_mp(task_id: str, elements: List[str], start_year: str, end_year: str
             parent_task_id=task_id 
         )
         total_tasks = len(sub_tasks_info)
-        update_task_status(db, task_id, "PROCESSING", 5.0, "子任务创建完成, 开始处理数据...")
-        print(f"|--> 主进程: 已为任务 {task_id} 创建 {total_tasks} 个子任务, 准备开始处理数据...")
+        update_task_status(db, task_id, "PROCESSING", 5.0, f"子任务创建完成(跳过 {len(existed)} 个已存在的要素年份), 开始处理数据...")
+        print(f"|--> 主进程: 已为任务 {task_id} 创建 {total_tasks} 个子任务(跳过 {len(existed)} 个已存在的要素年份), 准备开始处理数据...")
 
         # 2. 设置进程池并分发任务
         mp_context = mp.get_context("spawn")  # 使用spawn启动方法, 避免fork引起的问题
@@ -263,8 +272,7 @@ def process_mp(task_id: str, elements: List[str], start_year: str, end_year: str
                     return
             
                 # 从数据库查询子任务状态来计算进度
-                sub_tasks_from_db = get_subtasks_by_parent_id(db, task_id)
-                completed_count = sum(1 for t in sub_tasks_from_db if t.status in ["COMPLETED", "FAILED"])
+                completed_count = count_finished_subtasks(db, task_id)
                 overall_progress = (completed_count / total_tasks) * 80
                 update_task_status(db, task_id, "PROCESSING", overall_progress, f"已完成 {completed_count}/{total_tasks + 1} 个子任务")
                 sleep(15)  # 每15秒检查一次进度
@@ -12,7 +12,7 @@ from ..db.database import SessionLocal
 from ..core.config import settings
 from ..core.data_mapping import get_name_to_id_mapping, ELEMENT_TO_DB_MAPPING
 from ..core.data_pivot import bulid_feature_for_pivot
-from ..utils.file_io import load_model
+from ..utils.file_io import load_model_cached
 from ..utils.metrics import cal_metrics
 
 
@@ -50,7 +50,7 @@ def run_multi_station_eval(
 
         # 2. 加载模型
         crud.update_task_status(db, task_id, "PROCESSING", 5.0, "正在加载模型...")
-        model = load_model(model_path)
+        model = load_model_cached(model_path)
 
         # 3. 获取所有站点
         station_mapping = get_name_to_id_mapping(settings.STATION_INFO_PATH)
@@ -64,10 +64,11 @@ def run_multi_station_eval(
         start_time = datetime(start_year, 1, 1)
         end_time = datetime(end_year, 12, 31, 23)
         
-        # 4. 遍历站点进行评估
+        # 4. 遍历站点进行评估(进度按时间节流写入数据库, 不再每个站点提交一次)
+        progress_updater = crud.ThrottledStatusUpdater(db, task_id)
         for idx, (station_name, info) in enumerate(station_mapping.items()):
             current_progress = 10.0 + (idx / total_stations) * 80.0
-            crud.update_task_status(db, task_id, "PROCESSING", current_progress, f"正在评估站点: {station_name} ({idx+1}/{total_stations})")
+            progress_updater.update("PROCESSING", current_progress, f"正在评估站点: {station_name} ({idx+1}/{total_stations})")
             
             # 获取数据
             df_base = crud.get_proc_feature_for_pivot(
@@ -88,7 +89,7 @@ def run_multi_station_eval(
                 continue
 
             # 构建特征
-            df_X, df_y = bulid_feature_for_pivot(df_base.copy(), element)
+            df_X, df_y = bulid_feature_for_pivot(df_base, element)
             if df_X.empty: continue
             
             # 预测
@@ -96,7 +97,9 @@ def run_multi_station_eval(
             grid_values = df_X[grid_col].values
             obs_values = df_y.values
             
-            pred_raw = model.predict(df_X)
+            # 特征矩阵转换为连续的float32数组后预测(列顺序与训练时一致, 跳过DataFrame的特征名校验和类型转换)
+            X_arr = np.ascontiguousarray(df_X.to_numpy(dtype=np.float32))
+            pred_raw = model.predict(X_arr, validate_features=False)
             
             RESIDUAL_ELEMENTS = ["温度", "相对湿度", "过去1小时降水量"]
             if element in RESIDUAL_ELEMENTS:
@@ -0,0 +1,76 @@
+# src/utils/export_pool.py
+import os
+import threading
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+# 图像导出共用进程池的最大进程数(数据预览和数据透析的导出任务共用, 同时运行多个任务时也不会超出; 每个进程持有一张复用的大图, 不宜过多)
+EXPORT_POOL_MAX_WORKERS = 4
+# 每个任务最多同时提交到进程池的时次数(按进程数的倍数), 多个任务同时运行时轮流占用进程池
+EXPORT_POOL_IN_FLIGHT_FACTOR = 2
+
+_EXPORT_POOL = None
+_EXPORT_POOL_LOCK = threading.Lock()
+
+
+def _export_pool_workers() -> int:
+    """共用进程池的进程数: 至多EXPORT_POOL_MAX_WORKERS个, 并为主进程保留一个CPU"""
+    return max(1, min(EXPORT_POOL_MAX_WORKERS, (os.cpu_count() or 1) - 1))
+
+def get_export_pool() -> ProcessPoolExecutor:
+    """获取图像导出共用的进程池(首次使用时创建, 进程池损坏后重新创建)"""
+    global _EXPORT_POOL
+    with _EXPORT_POOL_LOCK:
+        if _EXPORT_POOL is None:
+            mp_context = mp.get_context("spawn")  # 使用spawn启动方法, 避免fork继承数据库连接和matplotlib等状态
+            _EXPORT_POOL = ProcessPoolExecutor(max_workers=_export_pool_workers(), mp_context=mp_context)
+        return _EXPORT_POOL
+
+def _discard_export_pool(pool: ProcessPoolExecutor):
+    """丢弃已损坏的进程池, 下次使用时重新创建"""
+    global _EXPORT_POOL
+    with _EXPORT_POOL_LOCK:
+        if _EXPORT_POOL is pool:
+            _EXPORT_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def map_in_export_pool(func, *iterables):
+    """
+    在共用进程池中对各组参数执行func, 按提交顺序逐个返回结果(与executor.map一致)。
+    每个任务同时提交的数量有限, 多个导出任务同时运行时共享进程池而不是各自创建进程池。
+
+    :param func: 模块级的子进程任务函数.
+    :param iterables: 各参数的可迭代对象.
+    """
+    pool = get_export_pool()
+    max_in_flight = _export_pool_workers() * EXPORT_POOL_IN_FLIGHT_FACTOR
+    args_iter = zip(*iterables)
+    pending = deque()
+    try:
+        while True:
+            # 保持提交窗口填满, 最早提交的时次最先返回
+            for args in args_iter:
+                pending.append(pool.submit(func, *args))
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                return
+            yield pending.popleft().result()
+    except BrokenProcessPool:
+        _discard_export_pool(pool)
+        raise
+    finally:
+        # 提前结束(出错或调用方不再读取)时取消尚未开始的时次
+        for future in pending:
+            future.cancel()
+
+def shutdown_export_pool():
+    """关闭图像导出共用的进程池(应用关闭时调用)"""
+    global _EXPORT_POOL
+    with _EXPORT_POOL_LOCK:
+        pool, _EXPORT_POOL = _EXPORT_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -1,16 +1,38 @@
 # src/utils/file_io.py
 import os
+import re
 import glob
+import gzip
 import json
+import base64
+import shutil
 import joblib
+import zipfile
 import xarray as xr
 import pandas as pd
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterable
 from datetime import datetime, timedelta
+from functools import lru_cache
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from ..core.config import settings
 from ..core.data_mapping import ELEMENT_TO_NC_MAPPING
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# 向zip包流式写入文件时的缓冲区大小(zf.write内部只使用8KB的缓冲区)
+ZIP_COPY_BUFFER_SIZE = 1024 * 1024
+# 打包格点文件时预读文件的线程数和最多提前预读的文件数(预读只提示内核把文件读入页缓存, 不占用进程内存)
+ZIP_PREFETCH_THREADS = 8
+ZIP_PREFETCH_MAX_IN_FLIGHT = 32
+# 格点文件名中的时间戳, 如 CARAS.2020010100.tmp.hourly.nc / corrected.CARAS.2020010100.tmp.hourly.nc
+NC_FILE_TIME_PATTERN = re.compile(r"^(corrected\.)?CARAS\.(\d{10})\.\w+\.hourly\.nc$")
+
 
 
 def get_station_files(dir):
@@ -88,6 +110,72 @@ def safe_open_mfdataset(grid_files, **kwargs):
             print(f"打开文件发生错误, by_coords和nested方案都失败: {e}")
             raise
 
+def write_file_to_zip(zf: zipfile.ZipFile, file_path, arcname: str = None):
+    """以1MB的缓冲区把文件流式写入zip包(保留文件修改时间, 压缩方式与zip包一致), 内存占用与文件大小无关"""
+    file_path = Path(file_path)
+    zinfo = zipfile.ZipInfo.from_file(file_path, arcname or file_path.name)
+    zinfo.compress_type = zf.compression
+    # 以无缓冲方式打开源文件: 每次直接读取1MB, 不再经过BufferedReader的额外拷贝; Linux下提示内核按顺序预读
+    with open(file_path, "rb", buffering=0) as src, zf.open(zinfo, "w") as dst:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(src.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        shutil.copyfileobj(src, dst, length=ZIP_COPY_BUFFER_SIZE)
+
+def _prefetch_zip_member(file_path: Path):
+    """提前打开待打包文件并提示内核预读(在预读线程中执行), 使文件打开和磁盘读取的延迟与写入重叠; 文件不可读时抛出OSError"""
+    with open(file_path, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+
+def write_files_to_zip(zf: zipfile.ZipFile, file_paths: List[Path], max_workers: int = ZIP_PREFETCH_THREADS,
+                       max_in_flight: int = ZIP_PREFETCH_MAX_IN_FLIGHT):
+    """
+    按顺序把多个文件流式写入zip包(zip包内为扁平结构), 由线程池提前打开后续文件并提示内核预读, 使文件打开和读取的延迟与写入重叠。
+    每个文件仍通过write_file_to_zip以1MB缓冲区流式写入, 内存占用与文件大小无关; 无法读取的文件打印警告并跳过。
+    每处理一个文件yield一次(该文件在file_paths中的序号, 已成功写入的文件数), 便于调用方更新进度。
+
+    :param zf: 以写模式打开的zip包, 各文件的压缩方式与zip包一致.
+    :param file_paths: 待写入的文件路径(按写入顺序).
+    :param max_workers: 预读线程数.
+    :param max_in_flight: 最多提前预读的文件数.
+    """
+    file_paths = [Path(p) for p in file_paths]
+    pending = deque()
+    files_written = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        next_index = 0
+        for index, file_path in enumerate(file_paths):
+            # 保持预读窗口填满, 写入仍按输入顺序进行, 保证zip包内顺序与输入一致
+            while next_index < len(file_paths) and len(pending) < max_in_flight:
+                pending.append(executor.submit(_prefetch_zip_member, file_paths[next_index]))
+                next_index += 1
+            try:
+                pending.popleft().result()
+                write_file_to_zip(zf, file_path)
+            except OSError as e:
+                # 文件已不存在或无法打开(此时尚未创建zip条目), 与缺少时次一样跳过, 不使整个导出失败
+                print(f"警告: 无法读取文件 {file_path}, 已跳过: {e}")
+            else:
+                files_written += 1
+            yield index, files_written
+
+def load_json(file_path):
+    """读取json文件: 安装了orjson时使用orjson解析(大文件明显更快), 否则退回标准库json"""
+    if orjson is not None:
+        with open(file_path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def encode_result_blob(payload: bytes) -> str:
+    """将json结果(字节串)压缩并编码为可直接存入任务参数的字符串"""
+    return base64.b64encode(gzip.compress(payload, compresslevel=1)).decode("ascii")
+
+def decode_result_blob(blob: str):
+    """解码encode_result_blob生成的字符串, 返回解析后的json结果"""
+    payload = gzip.decompress(base64.b64decode(blob))
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
 def save_model(
         model: object, model_name: str, element: str, start_year: str, 
         end_year: str, season: str, split_method: str, task_id: str
@@ -101,11 +189,35 @@ def save_model(
     joblib.dump(model, checkpoint_path)
     print(f"模型已保存到: {checkpoint_path}\n")
 
-def load_model(model_path):
-    """加载模型"""
+def load_model(model_path, device: str = None):
+    """加载模型, 若推理设备为cuda且模型为XGBoost模型, 则切换到GPU推理"""
     model = joblib.load(model_path)
+    device = device or settings.PREDICT_DEVICE
+    if device.startswith("cuda") and hasattr(model, "get_booster"):
+        if _xgboost_cuda_available():
+            model.set_params(device=device)
+        else:
+            print(f"|--> 警告: 当前XGBoost不支持CUDA, 模型 {Path(model_path).name} 将使用CPU推理")
     return model
 
+def load_model_cached(model_path, device: str = None):
+    """加载模型并在进程内缓存, 重复评估同一模型时不再重新反序列化(模型文件被覆盖后自动重新读取)"""
+    stat = os.stat(model_path)
+    return _load_model_cached(str(model_path), stat.st_mtime_ns, stat.st_size, device or settings.PREDICT_DEVICE)
+
+@lru_cache(maxsize=8)
+def _load_model_cached(model_path: str, mtime_ns: int, size: int, device: str):
+    """按(路径, 修改时间, 文件大小, 推理设备)缓存的load_model, 修改时间和文件大小仅作为缓存键"""
+    return load_model(model_path, device)
+
+def _xgboost_cuda_available() -> bool:
+    """检查当前安装的XGBoost是否编译了CUDA支持"""
+    try:
+        import xgboost
+        return bool(xgboost.build_info().get("USE_CUDA", False))
+    except Exception:
+        return False
+
 def save_losses(
         train_losses: list, test_losses: list, model_name: str, element: str,
         start_year: str, end_year: str, season: str, split_method: str, task_id: str
@@ -270,4 +382,38 @@ def find_corrected_nc_file_for_timestamp(element: str, timestamp: datetime) -> P
     # 检查文件是否存在
     if not file_path.exists():
         raise FileNotFoundError(f"订正后的格点文件 {file_path} 不存在, 请确认是否执行了该时段的订正")
-    return file_path
\ No newline at end of file
+    return file_path
+
+@lru_cache(maxsize=64)
+def _scan_nc_dir(year_dir: str, corrected: bool, mtime: float) -> Dict[str, Path]:
+    """扫描一个年份目录下的(订正后)格点文件, 返回{YYYYmmddHH: 文件路径}(按目录路径和修改时间缓存, 目录内文件增删后自动重新扫描)"""
+    file_index = {}
+    with os.scandir(year_dir) as entries:
+        for entry in entries:
+            match = NC_FILE_TIME_PATTERN.match(entry.name)
+            if match is None or bool(match.group(1)) != corrected:
+                continue
+            file_index[match.group(2)] = Path(entry.path)
+    return file_index
+
+def index_nc_files(element: str, years: Iterable[int], corrected: bool = False) -> Dict[str, Path]:
+    """
+    一次性列出指定要素、年份的格点文件, 代替逐时次调用find_nc_file_for_timestamp/find_corrected_nc_file_for_timestamp。
+
+    :param element: 要素名称.
+    :param years: 需要的年份.
+    :param corrected: True为订正后的格点文件, False为原始格点文件.
+    :return: {时间戳(YYYYmmddHH格式的字符串, 与文件名一致): 文件路径}, 不存在的时次不在字典中.
+    """
+    nc_var = ELEMENT_TO_NC_MAPPING.get(element)
+    if not nc_var:
+        raise ValueError(f"无效的要素名称: {element}")
+
+    root_dir = Path(settings.CORRECTION_OUTPUT_DIR if corrected else settings.GRID_DATA_DIR) / f"{nc_var}.hourly"
+    file_index = {}
+    for year in years:
+        year_dir = root_dir / str(year)
+        if not year_dir.is_dir():
+            continue
+        file_index.update(_scan_nc_dir(str(year_dir), corrected, os.path.getmtime(year_dir)))
+    return file_index
@@ -0,0 +1,15 @@
+# src/utils/plot_format.py
+from matplotlib.ticker import FuncFormatter
+
+
+def _deg_fmt_lon(x, pos):
+    """经度刻度格式化: 保留至多两位小数(':g'去掉末尾的0)"""
+    return f"{round(x, 2):g}°E"
+
+def _deg_fmt_lat(x, pos):
+    """纬度刻度格式化: 保留至多两位小数(':g'去掉末尾的0)"""
+    return f"{round(x, 2):g}°N"
+
+# 数据预览和数据透析的绘图共用的经纬度刻度格式化器(只格式化数值, 不依赖所属坐标轴, 可在多个坐标轴间共用)
+_FMT_LON = FuncFormatter(_deg_fmt_lon)
+_FMT_LAT = FuncFormatter(_deg_fmt_lat)
@@ -0,0 +1,97 @@
+# src/utils/province_geo.py
+import rioxarray
+import numpy as np
+import xarray as xr
+import geopandas as gpd
+from pathlib import Path
+from functools import lru_cache
+from rasterio.features import geometry_mask
+
+
+# 行政区划边界线的简化容差(度, 约200米), 小于导出图像中一个像元对应的经纬度范围, 简化前后肉眼无差别
+BOUNDARY_SIMPLIFY_TOLERANCE = 0.002
+# 绘图进程内缓存的湖北省栅格化掩膜, {(网格形状, 仿射变换): 布尔数组}
+_HUBEI_MASK_CACHE = {}
+
+
+@lru_cache(maxsize=1)
+def load_province_geo(province_geo_path: str, mtime: float = None):
+    """
+    读取湖北省行政区划边界, 并准备一个用于掩膜的合并后边界。
+    按路径和修改时间缓存, 数据预览和数据透析的绘图共用, 每个进程只读取一次。
+
+    :param province_geo_path: 行政区划GeoJSON文件路径.
+    :param mtime: 文件修改时间, 仅作为缓存键, 文件更新后自动重新读取.
+    :return: (province_gdf, hubei_mask_geometry), 读取失败时均为None.
+    """
+    province_gdf = None # 用于绘制市界
+    hubei_mask_geometry = None # 用于裁剪
+    province_geo_path = Path(province_geo_path)
+
+    if province_geo_path.exists():
+        try:
+            province_gdf = gpd.read_file(province_geo_path)
+
+            # 准备用于掩膜的省级边界
+            # 确保 CRS (WGS84)
+            if province_gdf.crs is None:
+                province_gdf_crs = province_gdf.set_crs("EPSG:4326")
+            else:
+                province_gdf_crs = province_gdf.to_crs("EPSG:4326")
+
+            # 创建一个合并的省级边界 (保留 province_gdf 不变, 用于绘制市级边界)
+            hubei_boundary_dissolved = province_gdf_crs.dissolve()
+            hubei_mask_geometry = hubei_boundary_dissolved.geometry
+
+            # 打印 GeoJSON 范围
+            print(f"信息: 成功加载 GeoJSON 掩膜. 边界范围 (lon/lat bounds): {hubei_mask_geometry.bounds}")
+
+        except Exception as geo_e:
+            print(f"读取行政区划失败: {geo_e}")
+            province_gdf = None
+            hubei_mask_geometry = None
+    else:
+         print(f"警告: 找不到 GeoJSON 文件: {province_geo_path}")
+    return province_gdf, hubei_mask_geometry
+
+@lru_cache(maxsize=1)
+def load_province_artists(province_geo_path: str, mtime: float = None):
+    """
+    预先计算各时次绘图共用的行政区划边界线和地名位置(每个进程只计算一次)。
+
+    :param province_geo_path: 行政区划GeoJSON文件路径.
+    :param mtime: 文件修改时间, 仅作为缓存键.
+    :return: (boundary_lines, city_labels), city_labels为[(x, y, 地名), ...]; 读取失败时为(None, []).
+    """
+    province_gdf, _ = load_province_geo(province_geo_path, mtime)
+    if province_gdf is None:
+        return None, []
+    # 边界线每次保存图像都要重新栅格化, 预先按亚像元容差简化以减少顶点数(地名位置仍按原始几何计算)
+    boundary_lines = province_gdf.boundary.simplify(BOUNDARY_SIMPLIFY_TOLERANCE, preserve_topology=True)
+    # 一次性计算所有地名的质心坐标, 只保留几何有效且有地名的行
+    name_col = 'name' if 'name' in province_gdf.columns else 'NAME' if 'NAME' in province_gdf.columns else None
+    if name_col is None:
+        return boundary_lines, []
+    names = province_gdf[name_col].fillna('').astype(str).to_numpy()
+    keep = (names != '') & province_gdf.geometry.notna().to_numpy() & ~province_gdf.geometry.is_empty.to_numpy()
+    centroids = province_gdf.geometry[keep].centroid
+    city_labels = list(zip(centroids.x.to_numpy(), centroids.y.to_numpy(), names[keep]))
+    return boundary_lines, city_labels
+
+def get_hubei_mask(hubei_mask_geometry, data_array: xr.DataArray) -> np.ndarray:
+    """
+    获取湖北省边界在当前网格上的栅格化掩膜(边界内为True), 与rio.clip(all_touched=True)的裁剪范围一致。
+    所有文件共用同一网格, 因此每个进程只需栅格化一次。
+
+    :param hubei_mask_geometry: 合并后的省级边界.
+    :param data_array: 已设置空间维度('x'/'y')和CRS的二维数据.
+    """
+    transform = data_array.rio.transform()
+    mask_key = (data_array.shape, tuple(transform))
+    hubei_mask = _HUBEI_MASK_CACHE.get(mask_key)
+    if hubei_mask is None:
+        hubei_mask = geometry_mask(
+            hubei_mask_geometry, out_shape=data_array.shape, transform=transform, all_touched=True, invert=True
+        )
+        _HUBEI_MASK_CACHE[mask_key] = hubei_mask
+    return hubei_mask